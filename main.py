@@ -1,8 +1,17 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse, HTMLResponse, Response
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-from src.response_generation import generate_notes, chat_response_generation
-from typing import Optional
+from contextlib import asynccontextmanager
+from src.response_generation import (
+    generate_notes, cached_notes_response, chat_response_generation, stream_chat_response, stream_notes,
+    regenerate_notes_section, open_chat_session, notes_jobs, youtube_handler
+)
+from src.jobs import JobQueueFull, SUCCEEDED
+from src.html_convertor import notes_stylesheet, bootstrap_script, asset_version
+from pygments.util import ClassNotFound
+from src.client_pool import groq_clients
+from typing import Literal, Optional
 import logging
 from src.logger import setup_logger
 # from src.cookies_getter import save_youtube_cookies
@@ -14,7 +23,16 @@ logger = setup_logger(
 )
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await notes_jobs.start()
+    yield
+    await notes_jobs.stop()
+    # Release pooled keep-alive connections to Groq
+    await groq_clients.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -23,17 +41,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cross-origin frontends need Link for fragment assets and ETag to revalidate notes themselves
+    expose_headers=["X-Session-Id", "Link", "ETag"],
 )
 
 # Request models
 class NotesRequest(BaseModel):
     videoId: str
     groq_api: Optional[str] = None
+    # 'fragment' returns only the rendered body; the page assets come from /api/assets
+    format: Literal['document', 'fragment'] = 'document'
+
+class NotesSectionRequest(BaseModel):
+    videoId: str
+    index: int
+    groq_api: Optional[str] = None
 
 class ChatbotRequest(BaseModel):
     query: str
     image: Optional[str] = None
     groq_api: Optional[str] = None
+    format: Literal['document', 'fragment'] = 'document'
+    # Continue a conversation returned in the X-Session-Id header; videoId lets the assistant see that lecture
+    session_id: Optional[str] = None
+    videoId: Optional[str] = None
 
 # Response models
 class NotesResponse(BaseModel):
@@ -41,6 +72,19 @@ class NotesResponse(BaseModel):
 
 class ChatbotResponse(BaseModel):
     response: str
+
+class NotesSectionResponse(BaseModel):
+    index: int
+    start: Optional[float] = None
+    end: Optional[float] = None
+    html: str
+
+class NotesJobResponse(BaseModel):
+    job_id: str
+    status: str
+    video_id: Optional[str] = None
+    progress: Optional[dict] = None
+    error: Optional[str] = None
     
 @app.get("/api/userlogin")
 def user_login():
@@ -58,28 +102,147 @@ async def ping():
        raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/notes", response_model=NotesResponse)
-async def create_notes(request: NotesRequest):
+async def create_notes(request: NotesRequest, http_request: Request):
     try:
 
         # Call the generate_notes function from response_generation.py
         logger.info(f"Generating notes for videoId: {request.videoId}")
-        response = generate_notes(request.videoId, request.groq_api)
+        response = await generate_notes(
+            request.videoId, request.groq_api, request.format,
+            accept_encoding=http_request.headers.get("accept-encoding")
+        )
         logger.info(f"Generated notes response: {response}")
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/notes/{video_id}")
+async def get_notes(video_id: str, http_request: Request, format: Literal['document', 'fragment'] = 'document'):
+    # Cacheable counterpart of POST /api/notes: re-opening a video revalidates with If-None-Match and gets a 304.
+    # It only serves notes that already exist; generating them is left to POST, so a GET never bills the model
+    logger.info(f"Fetching notes for videoId: {video_id}")
+    try:
+        response = await cached_notes_response(
+            f"https://www.youtube.com/watch?v={video_id}", format=format,
+            accept_encoding=http_request.headers.get("accept-encoding"),
+            if_none_match=http_request.headers.get("if-none-match")
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if response is None:
+        raise HTTPException(status_code=404, detail="No notes have been generated for this video yet")
+    return response
+
+@app.post("/api/notes/stream")
+async def create_notes_stream(request: NotesRequest):
+    # Progress events and section HTML are sent as Server-Sent Events while the notes are generated
+    logger.info(f"Streaming notes for videoId: {request.videoId}")
+    return StreamingResponse(
+        stream_notes(request.videoId, request.groq_api, request.format),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/notes/section", response_model=NotesSectionResponse)
+async def regenerate_section(request: NotesSectionRequest):
+    # Only the requested time range goes back to the model; the rest of the notes come from cache
+    logger.info(f"Regenerating section {request.index} for videoId: {request.videoId}")
+    try:
+        section = await regenerate_notes_section(request.videoId, request.index, request.groq_api)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return NotesSectionResponse(**section)
+
+@app.post("/api/notes/jobs", response_model=NotesJobResponse, status_code=202)
+async def create_notes_job(request: NotesRequest):
+    video_id = youtube_handler.extract_video_id(request.videoId)
+    if not video_id:
+        raise HTTPException(status_code=400, detail="Could not find a YouTube video ID in the URL")
+    try:
+        job_id = await notes_jobs.submit(video_id, request.groq_api)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    logger.info(f"Queued notes job {job_id} for videoId: {video_id}")
+    return NotesJobResponse(job_id=job_id, status="queued", video_id=video_id)
+
+@app.get("/api/notes/jobs/{job_id}", response_model=NotesJobResponse)
+async def get_notes_job(job_id: str):
+    job = await notes_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return NotesJobResponse(
+        job_id=job['id'],
+        status=job['status'],
+        video_id=job['video_id'],
+        progress=job['progress'],
+        error=job['error']
+    )
+
+@app.get("/api/notes/jobs/{job_id}/result")
+async def get_notes_job_result(job_id: str):
+    job = await notes_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job['status'] != SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return HTMLResponse(content=job['result'])
+
 @app.post("/api/chatbot", response_model=ChatbotResponse)
 async def chat_response(request: ChatbotRequest):
     try:
         # Call the chat response generation function
         # You'll need to import this function from your module
-        response = chat_response_generation(request.query, request.image, request.groq_api)
+        response = await chat_response_generation(
+            request.query, request.image, request.groq_api, request.format,
+            session_id=request.session_id, youtube_url=request.videoId
+        )
         logger.info(f"Generated chatbot response chatbot: {response}")
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/chatbot/stream")
+async def chat_response_stream(request: ChatbotRequest):
+    # Tokens and rendered markdown blocks are forwarded as Server-Sent Events
+    session = open_chat_session(request.session_id, request.videoId)
+    return StreamingResponse(
+        stream_chat_response(request.query, request.image, request.groq_api, session=session),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Session-Id": session.id}
+    )
+
+def asset_response(request: Request, content: str, media_type: str, version: Optional[str]) -> Response:
+    """Serve a static asset with an ETag; versioned URLs are cached for good."""
+    current = asset_version(content)
+    etag = f'"{current}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable" if version == current else "no-cache"
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type=media_type, headers=headers)
+
+@app.get("/api/assets/notes.css")
+async def notes_css(request: Request, style: str = 'monokai', v: Optional[str] = None):
+    try:
+        stylesheet = notes_stylesheet(style)
+    except ClassNotFound:
+        raise HTTPException(status_code=404, detail=f"Unknown code style: {style}")
+    return asset_response(request, stylesheet, "text/css", v)
+
+@app.get("/api/assets/notes.js")
+async def notes_js(request: Request, style: str = 'monokai', v: Optional[str] = None):
+    try:
+        # Validates the style name before it is placed in the script
+        notes_stylesheet(style)
+    except ClassNotFound:
+        raise HTTPException(status_code=404, detail=f"Unknown code style: {style}")
+    return asset_response(request, bootstrap_script(style), "application/javascript", v)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
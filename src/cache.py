@@ -0,0 +1,196 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Optional
+from .logger import get_logger
+
+logger = get_logger()
+
+
+class SQLiteCache:
+    def __init__(self, path: str, namespace: str, ttl_seconds: float, max_bytes: int):
+        """
+        On-disk key/value cache with TTL expiry and size-based LRU eviction.
+        Several namespaces can share one database file; each is bounded separately.
+        """
+        self.path = path
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_lru ON cache (namespace, accessed_at)")
+
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection; commits on success."""
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        """Return the raw value for a key, or None if missing or expired."""
+        now = time.time()
+        try:
+            with self._lock, self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value, created_at FROM cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, key)
+                ).fetchone()
+                if row is None:
+                    return None
+                value, created_at = row
+                if now - created_at > self.ttl_seconds:
+                    conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+                    return None
+                conn.execute(
+                    "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, self.namespace, key)
+                )
+                return value
+        except sqlite3.Error as e:
+            logger.warning(f"Cache read failed ({self.namespace}): {str(e)}")
+            return None
+
+    def set_bytes(self, key: str, value: bytes):
+        """Store a raw value and evict least recently used entries over the size budget."""
+        now = time.time()
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.namespace, key, value, len(value), now, now)
+                )
+                self._evict(conn, now)
+        except sqlite3.Error as e:
+            logger.warning(f"Cache write failed ({self.namespace}): {str(e)}")
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the JSON-decoded value for a key, or None."""
+        value = self.get_bytes(key)
+        if value is None:
+            return None
+        return json.loads(value)
+
+    def set(self, key: str, value: Any):
+        """Store a JSON-serializable value."""
+        self.set_bytes(key, json.dumps(value).encode('utf-8'))
+
+    def delete(self, key: str):
+        """Remove a key if present."""
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+        except sqlite3.Error as e:
+            logger.warning(f"Cache delete failed ({self.namespace}): {str(e)}")
+
+    def _evict(self, conn, now: float):
+        """Drop expired entries, then the least recently used ones until under max_bytes."""
+        conn.execute(
+            "DELETE FROM cache WHERE namespace = ? AND created_at < ?",
+            (self.namespace, now - self.ttl_seconds)
+        )
+        total = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM cache WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = conn.execute(
+            "SELECT key, size FROM cache WHERE namespace = ? ORDER BY accessed_at ASC",
+            (self.namespace,)
+        )
+        stale_keys = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale_keys.append((self.namespace, key))
+            total -= size
+        conn.executemany("DELETE FROM cache WHERE namespace = ? AND key = ?", stale_keys)
+        logger.info(f"Evicted {len(stale_keys)} entries from {self.namespace} cache")
+
+
+class MemoryCache:
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        """In-process LRU cache with TTL expiry."""
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the value for a key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, created_at = entry
+            if time.time() - created_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        """Store a value, evicting the least recently used entries over max_entries."""
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        """Remove a key if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class TieredCache:
+    def __init__(self, memory: MemoryCache, disk: SQLiteCache):
+        """Memory cache in front of a disk cache; disk hits are promoted to memory."""
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the value from the fastest tier that has it."""
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        value = self.disk.get(key)
+        if value is not None:
+            self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any):
+        """Write a value through to both tiers."""
+        self.memory.set(key, value)
+        self.disk.set(key, value)
+
+    def delete(self, key: str):
+        """Remove a key from both tiers."""
+        self.memory.delete(key)
+        self.disk.delete(key)
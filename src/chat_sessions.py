@@ -0,0 +1,84 @@
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+from .chunking import estimate_tokens
+from .logger import get_logger
+
+logger = get_logger()
+
+# summarize(previous_summary, turns) -> new summary, or None on failure
+Summarizer = Callable[[str, List[Dict[str, str]]], Awaitable[Optional[str]]]
+
+
+@dataclass
+class ChatSession:
+    """One conversation: a running summary of older turns plus the recent turns verbatim."""
+    id: str
+    video_id: Optional[str] = None
+    summary: str = ""
+    turns: List[Dict[str, str]] = field(default_factory=list)
+    updated_at: float = field(default_factory=time.time)
+
+    def add_turn(self, user_message: str, assistant_message: str):
+        """Record a completed exchange."""
+        self.turns.append({"role": "user", "content": user_message})
+        self.turns.append({"role": "assistant", "content": assistant_message})
+        self.updated_at = time.time()
+
+    def history_tokens(self) -> int:
+        """Tokens the verbatim turns add to a prompt."""
+        return sum(estimate_tokens(turn["content"]) for turn in self.turns)
+
+    async def compact(self, budget_tokens: int, summarize: Summarizer):
+        """
+        Keep the verbatim history within budget_tokens by folding the oldest exchanges into the summary.
+        History is cut down to half the budget each time, so summarization runs every few turns rather
+        than on every one. If summarizing fails the old turns are dropped, so the bound always holds.
+        """
+        if self.history_tokens() <= budget_tokens:
+            return
+
+        keep_tokens = 0
+        keep_from = len(self.turns)
+        # Walk back over whole exchanges (user + assistant) while they fit in half the budget
+        while keep_from >= 2:
+            exchange_tokens = sum(estimate_tokens(turn["content"]) for turn in self.turns[keep_from - 2:keep_from])
+            if keep_tokens + exchange_tokens > budget_tokens // 2:
+                break
+            keep_tokens += exchange_tokens
+            keep_from -= 2
+
+        older, self.turns = self.turns[:keep_from], self.turns[keep_from:]
+        summary = await summarize(self.summary, older)
+        if summary:
+            self.summary = summary
+        else:
+            logger.warning(f"Could not summarize chat session {self.id}; dropping {len(older)} older messages")
+
+
+class ChatSessionStore:
+    def __init__(self, max_sessions: int, ttl_seconds: float):
+        """In-memory chat sessions, expiring after ttl_seconds idle and evicted least recently used."""
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions = OrderedDict()
+
+    def get_or_create(self, session_id: Optional[str] = None, video_id: Optional[str] = None) -> ChatSession:
+        """Return a live session by ID, or start a new one if it is unknown or expired."""
+        session = self._sessions.get(session_id) if session_id else None
+        if session is not None and time.time() - session.updated_at > self.ttl_seconds:
+            del self._sessions[session_id]
+            session = None
+
+        if session is None:
+            session = ChatSession(id=uuid.uuid4().hex, video_id=video_id)
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session.id)
+            if video_id:
+                session.video_id = video_id
+        return session
@@ -0,0 +1,100 @@
+import math
+import subprocess
+from typing import List
+import numpy as np
+from .logger import get_logger
+
+logger = get_logger()
+
+
+def frame_energy(audio_path: str, ffmpeg: str, sample_rate: int = 8000, frame_seconds: float = 0.1, start_seconds: float = 0.0) -> np.ndarray:
+    """
+    RMS energy per frame of an audio file, from start_seconds on.
+    ffmpeg streams downsampled mono PCM and frames are reduced block by block,
+    so only the (small) energy array is ever kept in memory.
+    """
+    frame_length = int(sample_rate * frame_seconds)
+    block_bytes = frame_length * 2 * 600  # 60 seconds of s16le samples per read
+
+    process = subprocess.Popen(
+        [
+            ffmpeg, "-hide_banner", "-loglevel", "error",
+            "-ss", str(start_seconds),
+            "-i", str(audio_path),
+            "-map", "0:a:0", "-vn",
+            "-ac", "1", "-ar", str(sample_rate),
+            "-f", "s16le", "-"
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL
+    )
+
+    energies = []
+    leftover = np.empty(0, dtype=np.int16)
+    try:
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            samples = np.concatenate([leftover, np.frombuffer(data, dtype=np.int16)])
+            usable = len(samples) - len(samples) % frame_length
+            frames = samples[:usable].astype(np.float32).reshape(-1, frame_length)
+            energies.append(np.sqrt(np.mean(frames ** 2, axis=1)))
+            leftover = samples[usable:]
+    finally:
+        process.stdout.close()
+        returncode = process.wait()
+
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg exited with {returncode} while measuring audio energy")
+    if leftover.size:
+        energies.append(np.sqrt(np.mean(leftover.astype(np.float32) ** 2, keepdims=True)))
+    return np.concatenate(energies) if energies else np.empty(0, dtype=np.float32)
+
+
+def plan_cut_points(
+    energy: np.ndarray,
+    frame_seconds: float,
+    target_seconds: float,
+    max_seconds: float,
+    search_seconds: float,
+    smoothing_seconds: float = 0.5,
+    search_fraction: float = 0.25,
+    min_seconds: float = 1.0
+) -> List[float]:
+    """
+    Choose chunk boundaries (in seconds) at the quietest point near evenly spaced targets.
+    No chunk exceeds max_seconds, and the number of chunks matches a fixed
+    target_seconds split, so chunks come out close to uniform in length.
+    The search never reaches further than search_fraction of a chunk from its ideal cut,
+    and no chunk is shorter than min_seconds.
+    """
+    total_seconds = len(energy) * frame_seconds
+    num_chunks = math.ceil(total_seconds / target_seconds)
+    if num_chunks <= 1:
+        return []
+
+    # Smooth so a single quiet frame inside a word doesn't win over a real pause
+    window = max(1, int(smoothing_seconds / frame_seconds))
+    smoothed = np.convolve(energy, np.ones(window) / window, mode='same')
+
+    cut_points = []
+    previous = 0.0
+    for remaining in range(num_chunks, 1, -1):
+        # Re-spread what's left evenly so earlier shifts don't pile up in the last chunk
+        chunk_seconds = (total_seconds - previous) / remaining
+        ideal = previous + chunk_seconds
+        # A window wider than a fraction of the chunk could land next to the previous cut
+        window = min(search_seconds, chunk_seconds * search_fraction)
+        shortest = max(frame_seconds, min(min_seconds, chunk_seconds / 2))
+        low = max(previous + shortest, ideal - window)
+        high = min(previous + max_seconds, ideal + window, total_seconds - shortest)
+        if high <= low:
+            cut = min(ideal, previous + max_seconds)
+        else:
+            start_frame, end_frame = int(low / frame_seconds), int(high / frame_seconds) + 1
+            cut = (start_frame + int(np.argmin(smoothed[start_frame:end_frame]))) * frame_seconds
+        cut_points.append(round(cut, 3))
+        previous = cut
+
+    return cut_points
@@ -0,0 +1,125 @@
+import math
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    # Optional: exact counts when tiktoken is installed (cl100k is close to the Llama 3 vocabulary)
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoding = None
+
+# Calibrated on English lecture transcripts: Llama 3 averages ~4 characters per token
+CHARS_PER_TOKEN = 4.0
+
+_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count for text, exact with tiktoken and a conservative estimate otherwise."""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    # Every word/punctuation piece is at least one token; long words split further
+    return max(len(_PIECE_PATTERN.findall(text)), math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+@dataclass
+class Section:
+    """A slice of the transcript sent to the model as one request."""
+    index: int
+    text: str
+    start: Optional[float] = None  # seconds into the video, when captions are timestamped
+    end: Optional[float] = None
+
+
+def format_timestamp(seconds: float) -> str:
+    """Render seconds as m:ss or h:mm:ss."""
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text at sentence endings and line breaks."""
+    return [sentence for sentence in _SENTENCE_END.split(text) if sentence.strip()]
+
+
+class TokenChunker:
+    def __init__(self, max_tokens: int):
+        """Pack text units into sections of at most max_tokens each."""
+        self.max_tokens = max_tokens
+
+    def chunk_units(self, units: List[str]) -> List[str]:
+        """Greedily join consecutive units, never splitting one unless it alone exceeds the budget."""
+        return [' '.join(pieces) for pieces, _, _ in self._pack((unit, None, None) for unit in units)]
+
+    def chunk_text(self, text: str) -> List[str]:
+        """Split text into sections on sentence boundaries."""
+        return self.chunk_units(split_sentences(text))
+
+    def chunk_entries(self, entries: List[Dict[str, Any]]) -> List[Section]:
+        """
+        Pack timestamped caption entries into sections that begin and end on entry boundaries.
+        An entry too long for one section (e.g. a whole Whisper chunk) is split, and its pieces get
+        start times interpolated across the entry, ending where its duration or the next entry says.
+        """
+        def units():
+            for i, entry in enumerate(entries):
+                if 'duration' in entry:
+                    end = entry['start'] + entry['duration']
+                else:
+                    end = entries[i + 1]['start'] if i + 1 < len(entries) else None
+                yield entry['text'], entry['start'], end
+
+        sections = [
+            Section(index=i, text=' '.join(pieces), start=start, end=end)
+            for i, (pieces, start, end) in enumerate(self._pack(units()), 1)
+        ]
+        # The last section runs to the end of the final caption, if its duration is known
+        if sections and 'duration' in entries[-1]:
+            sections[-1].end = entries[-1]['start'] + entries[-1]['duration']
+        return sections
+
+    def _pack(self, units: Iterable[Tuple[str, Optional[float], Optional[float]]]) -> Iterator[Tuple[List[str], Optional[float], Optional[float]]]:
+        """Yield (pieces, start, next_start) for each section built from (text, start, end) units."""
+        current, current_tokens, start = [], 0, None
+        for text, unit_start, unit_end in units:
+            for piece, tokens, offset in self._fit(text):
+                # A piece of a split unit starts in proportion to the words before it;
+                # with no end to interpolate towards, only the first piece has a known start
+                piece_start = unit_start
+                if offset and unit_start is not None:
+                    piece_start = unit_start + offset * (unit_end - unit_start) if unit_end is not None else None
+                # Count one extra token per join; a separating space never costs more
+                if current and current_tokens + 1 + tokens > self.max_tokens:
+                    yield current, start, piece_start
+                    current, current_tokens = [], 0
+                if not current:
+                    start = piece_start
+                current_tokens += tokens + (1 if current else 0)
+                current.append(piece)
+        if current:
+            yield current, start, None
+
+    def _fit(self, unit: str):
+        """
+        Yield (piece, tokens, offset) for a unit, word-splitting it only if it is over budget on its own.
+        offset is the fraction of the unit's words that come before the piece.
+        """
+        if not unit or not unit.strip():
+            return
+        tokens = estimate_tokens(unit)
+        if tokens <= self.max_tokens:
+            yield unit.strip(), tokens, 0.0
+            return
+
+        # Unpunctuated captions can be one giant "sentence"; fall back to word boundaries
+        words = unit.split()
+        words_per_piece = max(1, int(len(words) * self.max_tokens / tokens))
+        for start in range(0, len(words), words_per_piece):
+            piece = ' '.join(words[start:start + words_per_piece])
+            yield piece, estimate_tokens(piece), start / len(words)
@@ -0,0 +1,66 @@
+from collections import OrderedDict
+from typing import Optional
+from groq import Groq, AsyncGroq
+from .config import Config
+from .logger import get_logger
+
+logger = get_logger()
+
+
+class GroqClientPool:
+    def __init__(self, max_clients: int = 32):
+        """
+        Keep one long-lived Groq client per API key so keep-alive connections are reused.
+        The server key is pinned; user-supplied keys are evicted least recently used first.
+        """
+        self.max_clients = max_clients
+        self._sync_clients = OrderedDict()
+        self._async_clients = OrderedDict()
+
+    def _resolve_key(self, api_key: Optional[str]) -> Optional[str]:
+        """Fall back to the server key when the request doesn't bring one."""
+        return api_key or Config.GROQ_API_KEY
+
+    def _get(self, clients: OrderedDict, factory, api_key: Optional[str]):
+        """Look up or create a client, evicting idle user keys beyond max_clients."""
+        key = self._resolve_key(api_key)
+        client = clients.get(key)
+        if client is not None:
+            clients.move_to_end(key)
+            return client
+
+        client = factory(api_key=key)
+        clients[key] = client
+        self._evict(clients)
+        return client
+
+    def _evict(self, clients: OrderedDict):
+        """Drop the least recently used user keys over the limit."""
+        # Evicted clients are only dereferenced: requests still holding one keep using it,
+        # and the SDK closes its connection pool once the last reference goes away.
+        for key in list(clients):
+            if len(clients) <= self.max_clients:
+                break
+            if key != Config.GROQ_API_KEY:
+                del clients[key]
+                logger.info("Evicted idle Groq client")
+
+    def get_sync(self, api_key: Optional[str] = None) -> Groq:
+        """Get the shared blocking client for an API key."""
+        return self._get(self._sync_clients, Groq, api_key)
+
+    def get_async(self, api_key: Optional[str] = None) -> AsyncGroq:
+        """Get the shared asyncio client for an API key."""
+        return self._get(self._async_clients, AsyncGroq, api_key)
+
+    async def aclose(self):
+        """Close every pooled client; called on application shutdown."""
+        for client in self._sync_clients.values():
+            client.close()
+        for client in self._async_clients.values():
+            await client.close()
+        self._sync_clients.clear()
+        self._async_clients.clear()
+
+
+groq_clients = GroqClientPool(max_clients=Config.GROQ_CLIENT_POOL_SIZE)
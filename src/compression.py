@@ -0,0 +1,38 @@
+import gzip
+from typing import Optional
+from .config import Config
+
+try:
+    # Optional: brotli compresses HTML noticeably better than gzip when it is installed
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def choose_encoding(accept_encoding: Optional[str], size: int) -> Optional[str]:
+    """Best content coding the client accepts for a body of this size, or None to send it as-is."""
+    if not accept_encoding or size < Config.COMPRESSION_MIN_BYTES:
+        return None
+
+    accepted = set()
+    for item in accept_encoding.split(','):
+        coding, _, params = item.strip().partition(';')
+        # "q=0" means the client refuses that coding
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Encode a body with 'br' or 'gzip'."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=Config.BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=Config.GZIP_LEVEL)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
@@ -12,7 +12,97 @@ class Config:
     # Model Settings
     GROQ_MODEL = "llama-3.3-70b-versatile"
     GROQ_VISION_MODEL="llama-3.2-90b-vision-preview"
+
+    # Long-lived Groq clients kept per API key
+    GROQ_CLIENT_POOL_SIZE = int(os.getenv('GROQ_CLIENT_POOL_SIZE', 32))
+
+    # Groq request pacing (per API key)
+    GROQ_REQUESTS_PER_SECOND = float(os.getenv('GROQ_REQUESTS_PER_SECOND', 1))
+    GROQ_REQUEST_BURST = int(os.getenv('GROQ_REQUEST_BURST', 4))
+
+    # Token budgets for note generation: sections are packed up to NOTES_SECTION_MAX_TOKENS,
+    # never past what fits in GROQ_CONTEXT_TOKENS next to the prompt and the reply
+    GROQ_CONTEXT_TOKENS = int(os.getenv('GROQ_CONTEXT_TOKENS', 131072))
+    NOTES_MAX_OUTPUT_TOKENS = int(os.getenv('NOTES_MAX_OUTPUT_TOKENS', 6000))
+    NOTES_SECTION_MAX_TOKENS = int(os.getenv('NOTES_SECTION_MAX_TOKENS', 8000))
+
+    # 'sections' joins per-section notes as-is; 'merge' folds them into one document,
+    # up to NOTES_MERGE_FAN_IN parts per merge request (fewer when their reply wouldn't fit)
+    NOTES_SYNTHESIS_MODE = os.getenv('NOTES_SYNTHESIS_MODE', 'sections')
+    NOTES_MERGE_FAN_IN = int(os.getenv('NOTES_MERGE_FAN_IN', 4))
+    # A merge may reply with as many tokens as its parts hold, up to the model's completion limit
+    NOTES_MERGE_MAX_OUTPUT_TOKENS = int(os.getenv('NOTES_MERGE_MAX_OUTPUT_TOKENS', 32768))
+
+    # Maximum lecture sections sent to the model at the same time (1 = sequential)
+    NOTES_MAX_CONCURRENT_SECTIONS = int(os.getenv('NOTES_MAX_CONCURRENT_SECTIONS', 4))
+
+    # Chat sessions: recent turns are kept verbatim up to CHAT_HISTORY_TOKENS, older ones are
+    # folded into a summary of at most CHAT_SUMMARY_MAX_TOKENS
+    CHAT_SESSION_MAX = int(os.getenv('CHAT_SESSION_MAX', 1000))
+    CHAT_SESSION_TTL = int(os.getenv('CHAT_SESSION_TTL', 6 * 3600))  # seconds idle
+    CHAT_HISTORY_TOKENS = int(os.getenv('CHAT_HISTORY_TOKENS', 3000))
+    CHAT_SUMMARY_MAX_TOKENS = int(os.getenv('CHAT_SUMMARY_MAX_TOKENS', 500))
+
+    # Transcripts up to CHAT_TRANSCRIPT_TOKENS are attached to chat whole; longer ones contribute only
+    # the CHAT_RETRIEVAL_TOP_K best-matching passages of about CHAT_PASSAGE_TOKENS each (BM25)
+    CHAT_TRANSCRIPT_TOKENS = int(os.getenv('CHAT_TRANSCRIPT_TOKENS', 2000))
+    CHAT_RETRIEVAL_TOP_K = int(os.getenv('CHAT_RETRIEVAL_TOP_K', 5))
+    CHAT_PASSAGE_TOKENS = int(os.getenv('CHAT_PASSAGE_TOKENS', 150))
+    RETRIEVAL_INDEX_ENTRIES = int(os.getenv('RETRIEVAL_INDEX_ENTRIES', 64))
+
+    # Whisper transcription of caption-less videos (pacing is per API key)
+    WHISPER_MAX_CONCURRENT_CHUNKS = int(os.getenv('WHISPER_MAX_CONCURRENT_CHUNKS', 4))
+    WHISPER_REQUESTS_PER_SECOND = float(os.getenv('WHISPER_REQUESTS_PER_SECOND', 0.5))
+    WHISPER_REQUEST_BURST = int(os.getenv('WHISPER_REQUEST_BURST', 4))
+
+    # yt-dlp format for caption-less videos; speech doesn't need more than ~96k source audio
+    AUDIO_SOURCE_FORMAT = os.getenv('AUDIO_SOURCE_FORMAT', 'bestaudio[abr<=96]/worstaudio/bestaudio')
+
+    # 'pipelined' streams audio through ffmpeg and transcribes chunks as they are written;
+    # 'staged' downloads the whole track, then splits, then transcribes.
+    # Pause-aware cuts need the whole track, so 'pipelined' also needs AUDIO_SILENCE_AWARE_SPLIT=false
+    # (fixed-length cuts); otherwise the staged path runs, as logged at startup
+    AUDIO_PIPELINE_MODE = os.getenv('AUDIO_PIPELINE_MODE', 'staged')
+
+    # 'ffmpeg' cuts chunks in one streaming pass; 'pydub' decodes the whole track in memory
+    AUDIO_SPLIT_MODE = os.getenv('AUDIO_SPLIT_MODE', 'ffmpeg')
+    AUDIO_CHUNK_BITRATE_KBPS = 64
+    WHISPER_MAX_CHUNK_MB = 25
+
+    # Move ffmpeg chunk boundaries to the quietest point within this many seconds of each cut
+    AUDIO_SILENCE_AWARE_SPLIT = os.getenv('AUDIO_SILENCE_AWARE_SPLIT', 'true').lower() == 'true'
+    AUDIO_SPLIT_SEARCH_SECONDS = float(os.getenv('AUDIO_SPLIT_SEARCH_SECONDS', 60))
     
+    # On-disk caches
+    CACHE_DIR = os.getenv('CACHE_DIR', 'data')
+    CACHE_DB_PATH = os.path.join(CACHE_DIR, 'cache.sqlite3')
+    TRANSCRIPT_CACHE_TTL = int(os.getenv('TRANSCRIPT_CACHE_TTL', 7 * 24 * 3600))  # seconds
+    TRANSCRIPT_CACHE_MAX_MB = int(os.getenv('TRANSCRIPT_CACHE_MAX_MB', 200))
+    NOTES_CACHE_TTL = int(os.getenv('NOTES_CACHE_TTL', 30 * 24 * 3600))  # seconds
+    NOTES_CACHE_MAX_MB = int(os.getenv('NOTES_CACHE_MAX_MB', 500))
+    NOTES_SECTION_CACHE_MAX_MB = int(os.getenv('NOTES_SECTION_CACHE_MAX_MB', 500))
+    NOTES_MEMORY_CACHE_ENTRIES = int(os.getenv('NOTES_MEMORY_CACHE_ENTRIES', 64))
+    NOTES_ENCODED_CACHE_MAX_MB = int(os.getenv('NOTES_ENCODED_CACHE_MAX_MB', 200))
+
+    # Notes responses at least this large are sent gzip/brotli-encoded; encoded bodies are cached,
+    # so the (slower) high compression levels are paid once per document
+    COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', 1024))
+    GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 9))
+    BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 9))
+
+    # Per-job scratch space for audio downloads and chunks (defaults to the system temp dir)
+    WORKSPACE_ROOT = os.getenv('WORKSPACE_ROOT')
+    WORKSPACE_QUOTA_MB = int(os.getenv('WORKSPACE_QUOTA_MB', 1024))
+
+    # Note-generation jobs
+    JOBS_DB_PATH = os.path.join(CACHE_DIR, 'jobs.sqlite3')
+    NOTES_JOB_WORKERS = int(os.getenv('NOTES_JOB_WORKERS', 2))
+    NOTES_JOB_MAX_QUEUED = int(os.getenv('NOTES_JOB_MAX_QUEUED', 100))
+    NOTES_JOB_RETENTION = int(os.getenv('NOTES_JOB_RETENTION', 24 * 3600))  # seconds
+
+    # Upper bound on note pipelines running at once in this process (jobs + direct requests)
+    MAX_CONCURRENT_PIPELINES = int(os.getenv('MAX_CONCURRENT_PIPELINES', 4))
+
     # # File Storage
     # NOTES_DIRECTORY = "saved_notes"
     
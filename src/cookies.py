@@ -0,0 +1,79 @@
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+from .logger import get_logger
+
+logger = get_logger()
+
+
+class CookieJarManager:
+    def __init__(self, env_var: str = 'COOKIES'):
+        """
+        Materialize the Netscape cookie file from an environment variable once per process.
+        Jobs share one read-only path and hold a reference while they use it.
+        """
+        self.env_var = env_var
+        self._dir: Optional[Path] = None
+        self._path: Optional[Path] = None
+        self._refs = 0
+        self._closing = False
+        self._lock = threading.Lock()
+
+    def _materialize(self) -> Path:
+        """Write the cookie file atomically into a private directory (caller holds the lock)."""
+        content = os.getenv(self.env_var)
+        if not content:
+            raise ValueError("Cookies not found")
+
+        # mkdtemp creates the directory with 0700, so only this user can read the cookies
+        self._dir = Path(tempfile.mkdtemp(prefix="notebuddy_cookies_"))
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        os.chmod(tmp_path, 0o600)
+        path = self._dir / "cookies.txt"
+        os.replace(tmp_path, path)
+
+        atexit.register(self.close)
+        logger.info("Cookie jar materialized")
+        return path
+
+    @contextmanager
+    def acquire(self) -> Iterator[str]:
+        """Yield the shared cookie file path, creating it on first use."""
+        with self._lock:
+            if self._path is None:
+                self._path = self._materialize()
+            self._closing = False
+            self._refs += 1
+            path = str(self._path)
+        try:
+            yield path
+        finally:
+            with self._lock:
+                self._refs -= 1
+                if self._closing and self._refs == 0:
+                    self._remove()
+
+    def close(self):
+        """Remove the cookie file once no job is using it."""
+        with self._lock:
+            self._closing = True
+            if self._refs == 0:
+                self._remove()
+
+    def _remove(self):
+        """Delete the private directory (caller holds the lock)."""
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            logger.info("Cookie jar removed")
+        self._dir = None
+        self._path = None
+
+
+cookie_jar = CookieJarManager()
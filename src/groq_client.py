@@ -1,63 +1,78 @@
-from groq import Groq
+from groq import AsyncGroq
 from .config import Config
-import time
+import asyncio
+import hashlib
+import json
 from .logger import get_logger
-from typing import List, Dict, Any, Optional
+from .rate_limiter import RateLimiterRegistry
+from .client_pool import groq_clients
+from .progress import report
+from .chunking import Section, TokenChunker, estimate_tokens, format_timestamp
+from .cache import SQLiteCache
+from .prompts import NOTES_SYSTEM_PROMPT, NOTES_MERGE_SYSTEM_PROMPT, PromptUsage, notes_user_message
+from typing import List, Dict, Any, Optional, Tuple
 
 logger = get_logger()
 
+
+class ChatFailed(Exception):
+    """Raised when a chat answer could not be produced (or broke off part-way)."""
+
+
 class GroqHandler:
     def __init__(self, groq_api=None):
         """Initialize Groq client with configuration settings."""
 
-        self.CHUNK_SIZE = 6000      # Characters per chunk
-        self.OVERLAP_SIZE = 200     # Increased overlap for better context
         self.RATE_LIMIT_DELAY = 1   
         self.MAX_RETRIES = 2        
 
-    def split_text_into_chunks(self, text: str) -> List[str]:
-        """Split text into manageable chunks while preserving context."""
-        chunks = []
-        text_length = len(text)
-        start = 0
-        
-        while start < text_length:
-            end = start + self.CHUNK_SIZE
-            
-            if end >= text_length:
-                chunks.append(text[start:])
-                break
-                
-            # Try to find sentence endings for more natural breaks
-            search_start = max(start, end - self.OVERLAP_SIZE)
-            break_point = end
-            
-            # Look for sentence endings (., !, ?)
-            for punct in ['. ', '! ', '? ']:
-                last_sent = text.rfind(punct, search_start, end)
-                if last_sent != -1:
-                    break_point = last_sent + 1
-                    break
-            
-            if break_point == end:
-                # Fallback to line breaks or spaces
-                last_newline = text.rfind('\n', search_start, end)
-                if last_newline != -1:
-                    break_point = last_newline
-                else:
-                    last_space = text.rfind(' ', search_start, end)
-                    if last_space != -1:
-                        break_point = last_space
-            
-            chunks.append(text[start:break_point])
-            start = break_point
+        # Sampling parameters for note generation
+        self.TEMPERATURE = 0.7
+        self.TOP_P = 1
+        self.SYSTEM_PROMPT = NOTES_SYSTEM_PROMPT
+        self.MERGE_SYSTEM_PROMPT = NOTES_MERGE_SYSTEM_PROMPT
+
+        # Bump whenever the notes prompts change so cached notes are invalidated
+        self.PROMPT_VERSION = 2
+
+        # Notes per transcript section, so one time range can be regenerated without re-billing the rest
+        self.section_cache = SQLiteCache(
+            Config.CACHE_DB_PATH,
+            namespace="sections",
+            ttl_seconds=Config.NOTES_CACHE_TTL,
+            max_bytes=Config.NOTES_SECTION_CACHE_MAX_MB * 1024 * 1024
+        )
+
+        # Merge results keyed by their inputs, so regenerating one section only re-bills the merges above it
+        self.merge_cache = SQLiteCache(
+            Config.CACHE_DB_PATH,
+            namespace="merges",
+            ttl_seconds=Config.NOTES_CACHE_TTL,
+            max_bytes=Config.NOTES_SECTION_CACHE_MAX_MB * 1024 * 1024
+        )
+
+        # Token buckets replace fixed sleeps between requests
+        self.rate_limiters = RateLimiterRegistry(
+            rate=Config.GROQ_REQUESTS_PER_SECOND,
+            capacity=Config.GROQ_REQUEST_BURST
+        )
+
+    @property
+    def section_token_budget(self) -> int:
+        """Transcript tokens per section: the configured cap, limited by what fits in the context window."""
+        overhead = estimate_tokens(self.create_educational_prompt("", 1, 1)) + estimate_tokens(self.SYSTEM_PROMPT)
+        available = Config.GROQ_CONTEXT_TOKENS - Config.NOTES_MAX_OUTPUT_TOKENS - overhead
+        return max(1, min(Config.NOTES_SECTION_MAX_TOKENS, available))
 
-        return chunks
+    def split_text_into_chunks(self, text: str) -> List[str]:
+        """Pack whole sentences into sections that fill the token budget."""
+        return TokenChunker(self.section_token_budget).chunk_text(text)
 
-    def process_chunk_with_retry(self, chunk: str, system_prompt: str, client: str, retry_count: int = 0) -> Optional[Dict[str, Any]]:
-        """Process a single chunk with retry mechanism."""
+    async def process_chunk_with_retry(self, chunk: str, system_prompt: str, client: AsyncGroq, retry_count: int = 0, max_tokens: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Process a single chunk with retry mechanism; max_tokens defaults to NOTES_MAX_OUTPUT_TOKENS."""
         try:
-            response = client.chat.completions.create(
+            await self.rate_limiters.get(client.api_key).acquire()
+            response = await client.chat.completions.create(
                 messages=[
                     {
                         "role": "system",
@@ -69,9 +84,9 @@ class GroqHandler:
                     }
                 ],
                 model=Config.GROQ_MODEL,
-                temperature=0.7,
-                max_tokens=self.CHUNK_SIZE,  
-                top_p=1,
+                temperature=self.TEMPERATURE,
+                max_tokens=max_tokens or Config.NOTES_MAX_OUTPUT_TOKENS,
+                top_p=self.TOP_P,
                 stream=False
             )
             return response
@@ -80,116 +95,253 @@ class GroqHandler:
             if retry_count < self.MAX_RETRIES:
                 wait_time = self.RATE_LIMIT_DELAY * (2 ** retry_count)
                 logger.warning(f"Processing error. Retrying in {wait_time} seconds..., Retry Count: {retry_count}")
-                time.sleep(wait_time)
-                return self.process_chunk_with_retry(chunk=chunk, system_prompt=system_prompt, client=client, retry_count=retry_count + 1)
+                await asyncio.sleep(wait_time)
+                return await self.process_chunk_with_retry(chunk=chunk, system_prompt=system_prompt, client=client, retry_count=retry_count + 1, max_tokens=max_tokens)
             else:
                 logger.error(f"Failed to process content after {self.MAX_RETRIES} retries: {str(e)}")
                 return None
 
-    def generate_educational_notes(self, transcript_text: str, groq_api=None) -> Optional[str]:
+    def _settings_fingerprint(self) -> bytes:
+        """Everything besides the transcript that changes what the model is asked for."""
+        return json.dumps({
+            'prompt_version': self.PROMPT_VERSION,
+            'model': Config.GROQ_MODEL,
+            'temperature': self.TEMPERATURE,
+            'top_p': self.TOP_P,
+            'max_tokens': Config.NOTES_MAX_OUTPUT_TOKENS,
+            'section_tokens': self.section_token_budget,
+        }, sort_keys=True).encode('utf-8')
+
+    def notes_cache_key(self, transcript_text: str) -> str:
+        """Content-addressed key for the notes this handler would generate from a transcript."""
+        digest = hashlib.sha256(self._settings_fingerprint())
+        digest.update(f"\0{Config.NOTES_SYNTHESIS_MODE}:{Config.NOTES_MERGE_FAN_IN}\0".encode('utf-8'))
+        # Merged notes also depend on the merge prompt; sections don't, so their cache survives changes to it
+        digest.update(self.MERGE_SYSTEM_PROMPT.encode('utf-8'))
+        digest.update(transcript_text.encode('utf-8'))
+        return digest.hexdigest()
+
+    def section_cache_key(self, section: Section, total_sections: int) -> str:
+        """Content-addressed key for one section; its position matters because the prompt mentions it."""
+        digest = hashlib.sha256(self._settings_fingerprint())
+        digest.update(f"\0{section.index}/{total_sections}\0".encode('utf-8'))
+        digest.update(section.text.encode('utf-8'))
+        return digest.hexdigest()
+
+    def merge_cache_key(self, parts: List[str], is_final: bool) -> str:
+        """Content-addressed key for one merge request."""
+        digest = hashlib.sha256(self._settings_fingerprint())
+        digest.update(self.MERGE_SYSTEM_PROMPT.encode('utf-8'))
+        digest.update(f"\0{'final' if is_final else 'partial'}\0".encode('utf-8'))
+        for part in parts:
+            digest.update(part.encode('utf-8'))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def merge_output_budget(self, parts: List[str]) -> int:
+        """Reply tokens for merging parts: as many as they hold, within the completion limit and the context window."""
+        prompt_tokens = estimate_tokens(self.create_merge_prompt(parts, True)) + estimate_tokens(self.MERGE_SYSTEM_PROMPT)
+        available = Config.GROQ_CONTEXT_TOKENS - prompt_tokens
+        wanted = max(Config.NOTES_MAX_OUTPUT_TOKENS, sum(estimate_tokens(part) for part in parts))
+        return min(wanted, Config.NOTES_MERGE_MAX_OUTPUT_TOKENS, available)
+
+    def group_for_merge(self, notes: List[str]) -> List[List[str]]:
+        """
+        Consecutive groups of up to NOTES_MERGE_FAN_IN parts, cut short whenever the next part would
+        leave the merge too little room to reply in full; a part that fits with no neighbour stays alone.
+        """
+        fan_in = max(2, Config.NOTES_MERGE_FAN_IN)
+        groups = []
+        for part in notes:
+            group = groups[-1] if groups else None
+            if group and len(group) < fan_in:
+                candidate = group + [part]
+                if self.merge_output_budget(candidate) >= sum(estimate_tokens(p) for p in candidate):
+                    group.append(part)
+                    continue
+            groups.append([part])
+        return groups
+
+    def plan_sections(self, transcript_text: str, detailed_transcript=None) -> List[Section]:
+        """Split a transcript into sections, aligned to caption timestamps when they are available."""
+        chunker = TokenChunker(self.section_token_budget)
+        if detailed_transcript:
+            return chunker.chunk_entries(detailed_transcript)
+        return [Section(index=i, text=text) for i, text in enumerate(chunker.chunk_text(transcript_text), 1)]
+
+    def section_heading(self, section: Section) -> str:
+        """Heading placed above a section's notes, with its time range when known."""
+        if section.start is None:
+            return f"Section {section.index} Notes:"
+        if section.end is None:
+            return f"Section {section.index} Notes ({format_timestamp(section.start)} onwards):"
+        return f"Section {section.index} Notes ({format_timestamp(section.start)} - {format_timestamp(section.end)}):"
+
+    async def generate_educational_notes(self, transcript_text: str, groq_api=None, progress=None, detailed_transcript=None) -> Optional[str]:
 
         """Generate detailed educational notes from transcript."""
         logger.info("Groq API Key: {}".format(groq_api))
-        if groq_api:
-            client = Groq(api_key=groq_api)
-        else:
-            client = Groq(api_key=Config.GROQ_API_KEY)
+        client = groq_clients.get_async(groq_api)
         try:
-            if len(transcript_text) > self.CHUNK_SIZE:
+            sections = self.plan_sections(transcript_text, detailed_transcript)
+            if len(sections) > 1:
                 logger.info("This appears to be a longer lecture. Processing in sections...")
-                return self.process_long_content(transcript_text, client)
-            
-            prompt = self.create_educational_prompt(transcript_text)
-            response = self.process_chunk_with_retry(
-                chunk=prompt,
-                system_prompt="You are an expert educational content creator, skilled at breaking down complex topics into clear, organized notes for students.",
-                client=client
-            )
-            
-            if response and response.choices:
-                return response.choices[0].message.content
-            return None
+            return await self.process_long_content(sections, client, progress=progress)
 
         except Exception as e:
             logger.error(f"Error processing educational content: {str(e)}")
             return None
 
-    def process_long_content(self, transcript_text: str, client) -> Optional[str]:
-        """Process longer lectures by sections while maintaining educational context."""
-        chunks = self.split_text_into_chunks(transcript_text)
-        logger.info(f"Processing lecture in {len(chunks)} sections to maintain detail and clarity...")
-        
-        # Process each chunk as a standalone section
-        section_notes = []
-        for i, chunk in enumerate(chunks, 1):
-            logger.info(f"Processing section {i} of {len(chunks)}...")
-            
-            if i > 1:
-                time.sleep(self.RATE_LIMIT_DELAY)
-            
-            section_prompt = self.create_educational_prompt(
-                chunk, 
-                section_number=i, 
-                total_sections=len(chunks)
-            )
-            
-            response = self.process_chunk_with_retry(
-                chunk=section_prompt,
-                system_prompt="You are an expert educational content creator, skilled at breaking down complex topics into clear, organized notes for students.",
-                client=client
-            )
-            
-            if response and response.choices:
-                section_notes.append(response.choices[0].message.content)
-        
-        # Combine sections with clear separation
-        if section_notes:
-            return "\n\n".join([
-                f"Section {i+1} Notes:\n{notes}" 
-                for i, notes in enumerate(section_notes)
-            ])
+    async def generate_section_notes(self, section: Section, total_sections: int, client: AsyncGroq, refresh: bool = False, usage: Optional[PromptUsage] = None) -> Optional[str]:
+        """Notes for one section, served from the per-section cache unless refresh is set."""
+        cache_key = self.section_cache_key(section, total_sections)
+        if not refresh:
+            cached = await asyncio.to_thread(self.section_cache.get, cache_key)
+            if cached:
+                logger.info(f"Section cache hit for section {section.index} of {total_sections}")
+                return cached['markdown']
+
+        if total_sections > 1:
+            prompt = self.create_educational_prompt(section.text, section_number=section.index, total_sections=total_sections)
+        else:
+            prompt = self.create_educational_prompt(section.text)
+        response = await self.process_chunk_with_retry(
+            chunk=prompt,
+            system_prompt=self.SYSTEM_PROMPT,
+            client=client
+        )
+        if response is not None and usage is not None:
+            usage.record(response, self.SYSTEM_PROMPT)
+
+        if response and response.choices:
+            notes = response.choices[0].message.content
+            await asyncio.to_thread(self.section_cache.set, cache_key, {'markdown': notes})
+            return notes
         return None
 
-    def create_educational_prompt(self, text: str, section_number: int = None, total_sections: int = None) -> str:
-        """Create a detailed prompt for educational content processing."""
-        context = ""
-        if section_number and total_sections:
-            context = f"\nThis is section {section_number} of {total_sections} from the lecture."
-
-        return f"""Please create detailed educational notes from this lecture transcript{context}. Focus on:
-
-1. Key Concepts and Definitions
-   - Identify and explain important terms and concepts
-   - Highlight fundamental principles discussed
-
-2. Main Ideas and Supporting Details
-   - Break down complex topics into clear explanations
-   - Include relevant examples or analogies used
-
-3. Important Relationships and Connections
-   - Show how different concepts relate to each other
-   - Identify cause-and-effect relationships
-
-4. Practical Applications
-   - Note any real-world applications mentioned
-   - Include practice problems or exercises if mentioned
-
-5. Additional Resources
-   - Note any recommended readings or materials mentioned
-   - Include references to related topics for further study
-
-Format the notes in a clear, hierarchical structure using markdown formatting. Include bullet points and sub-points where appropriate. If specific formulas, equations, or technical details are mentioned, include them with proper formatting.
-
-Headings should be content-specific, not necessarily matching the lecture structure. Use clear, concise language to explain complex topics effectively.
+    async def process_long_content(self, sections: List[Section], client: AsyncGroq, progress=None) -> Optional[str]:
+        """Process lecture sections concurrently while maintaining educational context."""
+        total = len(sections)
+        logger.info(f"Processing lecture in {total} sections to maintain detail and clarity...")
+        report(progress, "progress", stage="sections", total=total)
+        usage = PromptUsage()
+
+        # Sections are independent, so send up to NOTES_MAX_CONCURRENT_SECTIONS at once
+        semaphore = asyncio.Semaphore(Config.NOTES_MAX_CONCURRENT_SECTIONS)
+
+        async def process_section(section: Section) -> Optional[str]:
+            async with semaphore:
+                logger.info(f"Processing section {section.index} of {total}...")
+                notes = await self.generate_section_notes(section, total, client, usage=usage)
+                if notes is None:
+                    return None
+                # A lecture that fits in one section keeps its notes unwrapped
+                markdown = notes if total == 1 else f"{self.section_heading(section)}\n{notes}"
+                # Streaming clients get each section as soon as it's ready
+                report(
+                    progress, "section", index=section.index, total=total,
+                    start=section.start, end=section.end, markdown=markdown
+                )
+                return markdown
 
-Lecture Content:
-{text}
+        # gather keeps results in section order regardless of completion order
+        results = await asyncio.gather(*(process_section(section) for section in sections))
+        section_notes = [notes for notes in results if notes]
 
-Please maintain academic language while ensuring the notes are clear and accessible to students. Include any diagrams or visual concepts described in words."""
+        if not section_notes:
+            notes = None
+        elif Config.NOTES_SYNTHESIS_MODE == 'merge' and len(section_notes) > 1:
+            notes = await self.merge_notes(section_notes, client, progress=progress, usage=usage)
+        else:
+            # Combine sections with clear separation
+            notes = "\n\n".join(section_notes)
+
+        if usage.requests:
+            summary = usage.summary()
+            logger.info(
+                f"Prompt usage: {summary['requests']} requests, {summary['prompt_tokens']} input tokens, "
+                f"{summary['repeated_prefix_tokens']} in the repeated instruction prefix, "
+                f"{summary['cached_tokens']} served from the prompt cache"
+            )
+            report(progress, "progress", stage="usage", **summary)
+        return notes
+
+    async def merge_notes(self, notes: List[str], client: AsyncGroq, progress=None, usage: Optional[PromptUsage] = None) -> str:
+        """
+        Reduce section notes to one document by merging up to NOTES_MERGE_FAN_IN parts at a time.
+        Merges on the same level run concurrently, so latency grows with the tree depth only.
+        """
+        semaphore = asyncio.Semaphore(Config.NOTES_MAX_CONCURRENT_SECTIONS)
+        level = 0
+
+        async def merge_group(group: List[str], is_final: bool) -> str:
+            if len(group) == 1:
+                return group[0]
+            cache_key = self.merge_cache_key(group, is_final)
+            cached = await asyncio.to_thread(self.merge_cache.get, cache_key)
+            if cached:
+                logger.info(f"Merge cache hit for {len(group)} parts at level {level}")
+                return cached['markdown']
+
+            async with semaphore:
+                response = await self.process_chunk_with_retry(
+                    chunk=self.create_merge_prompt(group, is_final),
+                    system_prompt=self.MERGE_SYSTEM_PROMPT,
+                    client=client,
+                    max_tokens=self.merge_output_budget(group)
+                )
+            if response is not None and usage is not None:
+                usage.record(response, self.MERGE_SYSTEM_PROMPT)
+            reason = "failed"
+            if response and response.choices:
+                choice = response.choices[0]
+                # A merge cut off at max_tokens would silently drop the tail of the lecture
+                if choice.finish_reason != 'length':
+                    await asyncio.to_thread(self.merge_cache.set, cache_key, {'markdown': choice.message.content})
+                    return choice.message.content
+                reason = "hit the output limit"
+            # Keep the content even if this merge failed; the next level can still fold it in
+            logger.warning(f"Merge of {len(group)} parts {reason} at level {level}; keeping them unmerged")
+            return "\n\n".join(group)
+
+        while len(notes) > 1:
+            level += 1
+            groups = self.group_for_merge(notes)
+            if len(groups) == len(notes):
+                # No two neighbouring parts fit in one merge any more
+                logger.warning(f"{len(notes)} parts are too large to merge further; joining them as-is")
+                return "\n\n".join(notes)
+            logger.info(f"Merging {len(notes)} parts into {len(groups)} at level {level}...")
+            report(progress, "progress", stage="merge", level=level, parts=len(notes), groups=len(groups))
+            notes = await asyncio.gather(*(
+                merge_group(group, is_final=len(groups) == 1) for group in groups
+            ))
+        return notes[0]
+
+    def create_merge_prompt(self, parts: List[str], is_final: bool) -> str:
+        """Per-request merge message: how many parts, what they become, then the parts; the rules live in the system prompt."""
+        scope = "the complete notes for the whole lecture" if is_final else "one set of notes covering this part of the lecture"
+        joined = "\n\n".join(f"--- Part {i} ---\n{part}" for i, part in enumerate(parts, 1))
+        return f"""Below are {len(parts)} consecutive sets of notes taken from the same lecture, in order. Merge them into {scope}.
+
+{joined}"""
+
+    async def regenerate_section(self, transcript_text: str, index: int, groq_api=None, detailed_transcript=None) -> Tuple[Section, Optional[str]]:
+        """Re-run one section against the model, replacing its cached notes."""
+        sections = self.plan_sections(transcript_text, detailed_transcript)
+        if not 1 <= index <= len(sections):
+            raise ValueError(f"Section {index} does not exist; this lecture has {len(sections)} sections")
+
+        section = sections[index - 1]
+        client = groq_clients.get_async(groq_api)
+        notes = await self.generate_section_notes(section, len(sections), client, refresh=True)
+        if notes is None or len(sections) == 1:
+            return section, notes
+        return section, f"{self.section_heading(section)}\n{notes}"
 
-    def __init_subclass__(self) -> None:
-        """Remove the redundant summary combination step."""
-        pass  # We don't need to combine summaries anymore since we're keeping detailed section notes
+    def create_educational_prompt(self, text: str, section_number: int = None, total_sections: int = None) -> str:
+        """User message for one request; the instructions themselves live in SYSTEM_PROMPT."""
+        return notes_user_message(text, section_number=section_number, total_sections=total_sections)
 
     # def chat_completion(self, message: str, image=None) -> str:
     #         """
@@ -285,31 +437,68 @@ Keep responses concise yet informative, and maintain context of the conversation
     #         logger.error(f"Error encoding image: {str(e)}")
     #         return None
 
-    def process_streamed_chat(self, message: str, encoded_image=None, groq_api=None):
+    async def summarize_chat(self, summary: str, turns: List[Dict[str, str]], groq_api=None) -> Optional[str]:
+        """Fold older chat turns into the running conversation summary."""
+        client = groq_clients.get_async(groq_api)
+        conversation = "\n\n".join(f"{turn['role'].capitalize()}: {turn['content']}" for turn in turns)
+        previous = f"Summary so far:\n{summary}\n\n" if summary else ""
+        try:
+            await self.rate_limiters.get(client.api_key).acquire()
+            response = await client.chat.completions.create(
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You maintain a compact running summary of a conversation between a student and an AI assistant."
+                    },
+                    {
+                        "role": "user",
+                        "content": f"{previous}New messages:\n{conversation}\n\n"
+                                   "Update the summary to cover everything above. Keep the facts, questions, answers "
+                                   "and decisions the assistant will need later; drop pleasantries. Reply with the summary only."
+                    }
+                ],
+                model=Config.GROQ_MODEL,
+                temperature=0.3,
+                max_tokens=Config.CHAT_SUMMARY_MAX_TOKENS,
+                stream=False
+            )
+            if response.choices:
+                return response.choices[0].message.content
+        except Exception as e:
+            logger.error(f"Error summarizing chat history: {str(e)}")
+        return None
+
+    async def process_streamed_chat(self, message: str, encoded_image=None, groq_api=None, history=None, context=None):
             """
             Process chat message with streaming response
             Args:
                 message: User's text message
                 image: Optional PIL Image
+                history: Earlier user/assistant messages of the session, oldest first
+                context: Extra background (conversation summary, lecture transcript) for the assistant
             Yields:
                 str: Response chunks
+            Raises:
+                ChatFailed: if the request fails; anything already yielded is an incomplete answer
             """
 
-            if groq_api:
-                client = Groq(api_key=groq_api)
-            else:
-                client = Groq(api_key=Config.GROQ_API_KEY)
+            client = groq_clients.get_async(groq_api)
+            history = list(history or [])
+            system_prompt = self._get_chat_system_prompt()
+            if context:
+                system_prompt = f"{system_prompt}\n\n{context}"
                 
             try:
                 if encoded_image:
-                    # For vision model: no system message, only user message with image
+                    # For vision model: no system message, so background context goes in front of the question
                     image_url = encoded_image
                     if image_url:
-                        messages = [
+                        text = f"{context}\n\n{message}" if context else message
+                        messages = history + [
                             {
                                 "role": "user",
                                 "content": [
-                                    {"type": "text", "text": message},
+                                    {"type": "text", "text": text},
                                     {
                                         "type": "image_url",
                                         "image_url": {
@@ -325,8 +514,9 @@ Keep responses concise yet informative, and maintain context of the conversation
                         messages = [
                             {
                                 "role": "system",
-                                "content": "You are a helpful AI assistant."
+                                "content": system_prompt
                             },
+                            *history,
                             {
                                 "role": "user",
                                 "content": f"[Image processing failed] {message}"
@@ -338,8 +528,9 @@ Keep responses concise yet informative, and maintain context of the conversation
                     messages = [
                         {
                             "role": "system",
-                            "content": "You are a helpful AI assistant."
+                            "content": system_prompt
                         },
+                        *history,
                         {
                             "role": "user",
                             "content": message
@@ -347,7 +538,7 @@ Keep responses concise yet informative, and maintain context of the conversation
                     ]
                     model = Config.GROQ_MODEL
 
-                response = client.chat.completions.create(
+                response = await client.chat.completions.create(
                     messages=messages,
                     model=model,
                     temperature=0.7,
@@ -355,7 +546,7 @@ Keep responses concise yet informative, and maintain context of the conversation
                     stream=True
                 )
                 
-                for chunk in response:
+                async for chunk in response:
                     if chunk.choices and chunk.choices[0].delta.content:
                         yield chunk.choices[0].delta.content
                         
@@ -366,4 +557,4 @@ Keep responses concise yet informative, and maintain context of the conversation
                 Message: {str(e)}
                 """
                 logger.error(error_msg)
-                yield "I apologize, but I encountered an error processing your message. Please check the error details above."
\ No newline at end of file
+                raise ChatFailed(str(e)) from e
\ No newline at end of file
@@ -1,11 +1,24 @@
+import hashlib
+import re
+import threading
+from functools import lru_cache
 import markdown
+from pygments.formatters import HtmlFormatter
 from markdown.extensions.codehilite import CodeHiliteExtension
 from markdown.extensions.fenced_code import FencedCodeExtension
 from markdown.extensions.tables import TableExtension
 from markdown.extensions.toc import TocExtension
 from markdown.extensions.attr_list import AttrListExtension
 
-def convert_markdown_to_html(markdown_text, code_style='monokai'):
+# Markdown instances aren't thread-safe, so each worker thread keeps its own and resets it between documents
+_converters = threading.local()
+
+# Placeholder for the rendered body inside the precompiled page shell
+_CONTENT_MARKER = "\0NOTEBUDDY_CONTENT\0"
+
+
+def _build_converter():
+    """Create a markdown converter with the app's extensions."""
     # Configure markdown extensions
     extensions = [
         CodeHiliteExtension(css_class='highlight', use_pygments=True),
@@ -17,17 +30,163 @@ def convert_markdown_to_html(markdown_text, code_style='monokai'):
         'markdown.extensions.nl2br',
         'markdown.extensions.sane_lists',
     ]
-    
+
     # Create markdown converter with extensions
-    md = markdown.Markdown(extensions=extensions)
-    
-    # Convert markdown to HTML
-    html_content = md.convert(markdown_text)
-    
-    # Get Pygments CSS for code highlighting
-    from pygments.formatters import HtmlFormatter
-    pygments_css = HtmlFormatter(style=code_style).get_style_defs('.highlight')
-    
+    return markdown.Markdown(extensions=extensions)
+
+
+def render_markdown(markdown_text):
+    """Render markdown to an HTML fragment (no page shell)."""
+    md = getattr(_converters, 'md', None)
+    if md is None:
+        md = _converters.md = _build_converter()
+
+    # Convert markdown to HTML, clearing state (TOC, footnotes, references) left by the previous document
+    md.reset()
+    return md.convert(markdown_text)
+
+
+@lru_cache(maxsize=None)
+def pygments_css(code_style='monokai'):
+    """Pygments CSS for code highlighting, computed once per style."""
+    return HtmlFormatter(style=code_style).get_style_defs('.highlight')
+
+
+# Page styles shared by full documents and the standalone stylesheet
+_PAGE_CSS = """
+body {
+    max-width: 900px;
+    margin: 0 auto;
+    padding: 20px;
+    font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif;
+    line-height: 1.6;
+}
+
+/* Code blocks styling */
+.highlight {
+    background-color: #272822;
+    padding: 1em;
+    border-radius: 4px;
+    margin: 1em 0;
+    overflow-x: auto;
+}
+
+/* Table styling */
+table {
+    border-collapse: collapse;
+    width: 100%;
+    margin: 1em 0;
+}
+th, td {
+    border: 1px solid #ddd;
+    padding: 8px;
+    text-align: left;
+}
+th {
+    background-color: #f5f5f5;
+}
+
+/* Mermaid diagram styling */
+.mermaid {
+    text-align: center;
+    margin: 1em 0;
+}
+
+/* Math equations styling */
+.math {
+    overflow-x: auto;
+    margin: 1em 0;
+}
+"""
+
+# Loads the client-side libraries once and exposes NoteBuddy.render(root) for inserted fragments
+_BOOTSTRAP_JS = r"""(function () {
+    var libraries = [
+        "https://cdnjs.cloudflare.com/ajax/libs/mermaid/9.3.0/mermaid.min.js",
+        "https://cdnjs.cloudflare.com/ajax/libs/mathjax/3.2.0/es5/tex-mml-chtml.js",
+        "https://cdnjs.cloudflare.com/ajax/libs/highlight.js/11.7.0/highlight.min.js"
+    ];
+
+    window.MathJax = window.MathJax || {
+        tex: {
+            inlineMath: [['$','$'], ['\(','\)']],
+            displayMath: [['$$','$$'], ['\[','\]']],
+            processEscapes: true
+        },
+        startup: { typeset: false }
+    };
+
+    var theme = document.createElement("link");
+    theme.rel = "stylesheet";
+    theme.href = "https://cdnjs.cloudflare.com/ajax/libs/highlight.js/11.7.0/styles/__CODE_STYLE__.min.css";
+    document.head.appendChild(theme);
+
+    function load(src) {
+        return new Promise(function (resolve, reject) {
+            var script = document.createElement("script");
+            script.src = src;
+            script.onload = resolve;
+            script.onerror = reject;
+            document.head.appendChild(script);
+        });
+    }
+
+    var ready = Promise.all(libraries.map(load)).then(function () {
+        mermaid.initialize({ startOnLoad: false });
+        return MathJax.startup.promise;
+    });
+
+    window.NoteBuddy = {
+        // Call after inserting a notes or chat fragment into the page
+        render: function (root) {
+            var scope = root || document;
+            return ready.then(function () {
+                mermaid.init(undefined, scope.querySelectorAll(".mermaid"));
+                scope.querySelectorAll("pre code").forEach(function (block) {
+                    hljs.highlightElement(block);
+                });
+                return MathJax.typesetPromise(root ? [root] : undefined);
+            });
+        }
+    };
+})();
+"""
+
+# Where main.py serves the stylesheet and bootstrap script for fragment responses
+ASSET_ROUTE = "/api/assets"
+
+
+@lru_cache(maxsize=None)
+def notes_stylesheet(code_style='monokai'):
+    """Page CSS plus Pygments rules for a code style."""
+    return _PAGE_CSS + pygments_css(code_style)
+
+
+@lru_cache(maxsize=None)
+def bootstrap_script(code_style='monokai'):
+    """Script that loads Mermaid, MathJax and highlight.js and renders fragments."""
+    return _BOOTSTRAP_JS.replace("__CODE_STYLE__", code_style)
+
+
+@lru_cache(maxsize=None)
+def asset_version(content):
+    """Short content hash used as the ETag and cache-busting version of an asset."""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+
+
+@lru_cache(maxsize=None)
+def fragment_link_header(code_style='monokai'):
+    """Link header pointing fragment responses at their versioned stylesheet and script."""
+    css = f"{ASSET_ROUTE}/notes.css?style={code_style}&v={asset_version(notes_stylesheet(code_style))}"
+    js = f"{ASSET_ROUTE}/notes.js?style={code_style}&v={asset_version(bootstrap_script(code_style))}"
+    return f'<{css}>; rel="stylesheet", <{js}>; rel="preload"; as="script"'
+
+
+@lru_cache(maxsize=None)
+def _document_shell(code_style):
+    """Page markup before and after the body for a code style, built once per style."""
+    stylesheet = notes_stylesheet(code_style)
+
     html_template = f"""
     <!DOCTYPE html>
     <html>
@@ -43,55 +202,11 @@ def convert_markdown_to_html(markdown_text, code_style='monokai'):
         <script src="https://cdnjs.cloudflare.com/ajax/libs/highlight.js/11.7.0/highlight.min.js"></script>
         
         <style>
-            body {{
-                max-width: 900px;
-                margin: 0 auto;
-                padding: 20px;
-                font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif;
-                line-height: 1.6;
-            }}
-            
-            /* Code blocks styling */
-            .highlight {{ 
-                background-color: #272822;
-                padding: 1em;
-                border-radius: 4px;
-                margin: 1em 0;
-                overflow-x: auto;
-            }}
-            
-            /* Table styling */
-            table {{
-                border-collapse: collapse;
-                width: 100%;
-                margin: 1em 0;
-            }}
-            th, td {{
-                border: 1px solid #ddd;
-                padding: 8px;
-                text-align: left;
-            }}
-            th {{
-                background-color: #f5f5f5;
-            }}
-            
-            /* Mermaid diagram styling */
-            .mermaid {{
-                text-align: center;
-                margin: 1em 0;
-            }}
-            
-            /* Math equations styling */
-            .math {{
-                overflow-x: auto;
-                margin: 1em 0;
-            }}
-            
-            {pygments_css}
+{stylesheet}
         </style>
     </head>
     <body>
-        {html_content}
+        {_CONTENT_MARKER}
         
         <script>
             // Initialize Mermaid
@@ -112,5 +227,127 @@ def convert_markdown_to_html(markdown_text, code_style='monokai'):
     </body>
     </html>
     """
-    
-    return html_template
\ No newline at end of file
+
+    head, tail = html_template.split(_CONTENT_MARKER)
+    return head, tail
+
+
+def wrap_html_document(body_html, code_style='monokai'):
+    """Place already-rendered HTML inside the full notes page."""
+    head, tail = _document_shell(code_style)
+    return head + body_html + tail
+
+
+def convert_markdown_to_html(markdown_text, code_style='monokai'):
+    return wrap_html_document(render_markdown(markdown_text), code_style)
+
+_FENCE = re.compile(r"^(\s*)(`{3,}|~{3,})")
+_HEADING = re.compile(r"^#{1,6}(\s|$)")
+_LIST_ITEM = re.compile(r"^\s{0,3}(?:[-*+]|\d+[.)])\s")
+
+
+class IncrementalMarkdownRenderer:
+    """
+    Render a markdown stream block by block.
+    Text is fed as it arrives and HTML is produced only for blocks that can no longer change;
+    the open tail stays pending. Every line is scanned once and every block rendered once,
+    so a whole stream costs linear work.
+    Blocks are rendered independently, so this is for live previews only; render a finished
+    document with render_markdown so reference links, footnotes and heading ids resolve.
+
+    Block boundaries:
+    - a blank line ends a paragraph or table, but only once the next line shows it doesn't continue a list
+    - blank lines inside fenced code don't count; a top-level fence is emitted as soon as it closes
+    - an ATX heading is emitted on its own as soon as its line ends
+    """
+
+    def __init__(self):
+        self._pending_lines = []
+        self._partial = []            # fragments of the current, unfinished line
+        self._fence = None            # closing marker while inside fenced code
+        self._fence_standalone = False
+        self._after_blank = False     # blank line(s) seen after the pending block
+
+    def feed(self, text):
+        """Add streamed text and return HTML for any blocks it completed."""
+        self._partial.append(text)
+        if '\n' not in text:
+            return []
+
+        *lines, rest = ''.join(self._partial).split('\n')
+        self._partial = [rest] if rest else []
+        rendered = []
+        for line in lines:
+            self._add_line(line, rendered)
+        return rendered
+
+    def flush(self):
+        """Render whatever is still pending at the end of the stream."""
+        rendered = []
+        if self._partial:
+            self._add_line(''.join(self._partial), rendered)
+            self._partial = []
+        self._fence = None
+        self._close_block(rendered)
+        return ''.join(rendered)
+
+    def _add_line(self, line, rendered):
+        """Route one complete line, appending HTML for any block it closes."""
+        if self._fence is not None:
+            self._pending_lines.append(line)
+            if line.strip().startswith(self._fence) and not line.strip().strip(self._fence[0]):
+                self._fence = None
+                if self._fence_standalone:
+                    self._close_block(rendered)
+            return
+
+        if not line.strip():
+            if self._pending_lines:
+                self._after_blank = True
+            return
+
+        if self._after_blank:
+            self._after_blank = False
+            if self._continues_list(line):
+                self._pending_lines.append('')
+            else:
+                self._close_block(rendered)
+
+        fence = _FENCE.match(line)
+        if fence:
+            nested = self._pending_lines and self._is_list() and fence.group(1)
+            if not nested:
+                self._close_block(rendered)
+            self._fence = fence.group(2)
+            self._fence_standalone = not nested
+            self._pending_lines.append(line)
+            return
+
+        if _HEADING.match(line):
+            self._close_block(rendered)
+            rendered.append(render_markdown(line))
+            return
+
+        self._pending_lines.append(line)
+
+    def _is_list(self):
+        """Whether the pending block is a list."""
+        return bool(_LIST_ITEM.match(self._pending_lines[0]))
+
+    def _continues_list(self, line):
+        """Whether a line after a blank line belongs to the pending list (next item or indented content)."""
+        return self._is_list() and (bool(_LIST_ITEM.match(line)) or line[0] in ' \t')
+
+    def _close_block(self, rendered):
+        """Render the pending block, if any, onto rendered."""
+        block_html = self._take_block()
+        if block_html:
+            rendered.append(block_html)
+
+    def _take_block(self):
+        """Render and clear the pending lines."""
+        if not self._pending_lines:
+            return ""
+        block = '\n'.join(self._pending_lines)
+        self._pending_lines = []
+        return render_markdown(block)
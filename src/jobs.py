@@ -0,0 +1,216 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from .logger import get_logger
+
+logger = get_logger()
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobQueueFull(Exception):
+    """Raised when the job backlog is at capacity."""
+
+
+class JobStore:
+    def __init__(self, path: str):
+        """SQLite table of note-generation jobs so status survives restarts."""
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    video_id TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    has_user_key INTEGER NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection; commits on success."""
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def create(self, video_id: str, has_user_key: bool) -> str:
+        """Insert a queued job and return its ID."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, video_id, status, has_user_key, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, video_id, QUEUED, int(has_user_key), now, now)
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job row as a dict, or None."""
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def update(self, job_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None):
+        """Move a job to a new status, recording its result or error."""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, result, error, time.time(), job_id)
+            )
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        """Jobs that were queued or running, oldest first."""
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (QUEUED, RUNNING)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def prune(self, older_than: float):
+        """Delete finished jobs last updated before a timestamp."""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (SUCCEEDED, FAILED, older_than)
+            )
+
+
+class JobManager:
+    def __init__(
+        self,
+        store: JobStore,
+        runner: Callable[..., Awaitable[str]],
+        worker_count: int,
+        max_queued: int,
+        retention_seconds: float
+    ):
+        """
+        Run note jobs on a fixed pool of asyncio workers.
+        runner(video_id, groq_api, progress=...) must return the notes HTML.
+        """
+        self.store = store
+        self.runner = runner
+        self.worker_count = worker_count
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._pruned_at = 0.0
+
+        # User API keys and live progress are never written to disk
+        self._api_keys: Dict[str, Optional[str]] = {}
+        self._progress: Dict[str, Dict[str, Any]] = {}
+
+    async def start(self):
+        """Recover jobs left over from the previous process and start the workers."""
+        self._queue = asyncio.Queue()
+        await asyncio.to_thread(self.store.prune, time.time() - self.retention_seconds)
+        self._pruned_at = time.time()
+
+        for job in await asyncio.to_thread(self.store.unfinished):
+            if job['has_user_key']:
+                # The key only lived in memory, so the job can't be resumed on the user's quota
+                await asyncio.to_thread(
+                    self.store.update, job['id'], FAILED,
+                    error="Interrupted by a server restart; please resubmit"
+                )
+                continue
+            await asyncio.to_thread(self.store.update, job['id'], QUEUED)
+            self._api_keys[job['id']] = None
+            self._queue.put_nowait((job['id'], job['video_id']))
+            logger.info(f"Re-queued job {job['id']} after restart")
+
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.worker_count)
+        ]
+
+    async def stop(self):
+        """Cancel the workers; running jobs stay 'running' and are recovered on next start."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, video_id: str, groq_api: Optional[str] = None) -> str:
+        """Queue a job and return its ID."""
+        if self._queue.qsize() >= self.max_queued:
+            raise JobQueueFull("Too many note jobs are waiting; try again later")
+
+        job_id = await asyncio.to_thread(self.store.create, video_id, bool(groq_api))
+        self._api_keys[job_id] = groq_api
+        self._queue.put_nowait((job_id, video_id))
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the stored job with its latest in-memory progress."""
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is not None:
+            job['progress'] = self._progress.get(job_id)
+        return job
+
+    async def _worker(self):
+        """Take jobs off the queue one at a time until cancelled."""
+        while True:
+            job_id, video_id = await self._queue.get()
+            try:
+                await self._run(job_id, video_id)
+            finally:
+                self._queue.task_done()
+            await self._prune()
+
+    async def _prune(self):
+        """Drop expired finished jobs, at most once a minute however many workers finish jobs."""
+        now = time.time()
+        if now - self._pruned_at < 60:
+            return
+        self._pruned_at = now
+        try:
+            await asyncio.to_thread(self.store.prune, now - self.retention_seconds)
+        except Exception as e:
+            logger.error(f"Error pruning finished jobs: {str(e)}")
+
+    async def _run(self, job_id: str, video_id: str):
+        """Run one job and persist its outcome."""
+        groq_api = self._api_keys.pop(job_id, None)
+
+        def progress(event, data):
+            if event == "progress":
+                self._progress[job_id] = data
+
+        await asyncio.to_thread(self.store.update, job_id, RUNNING)
+        logger.info(f"Running job {job_id} for videoId: {video_id}")
+        try:
+            html_output = await self.runner(video_id, groq_api, progress=progress)
+            await asyncio.to_thread(self.store.update, job_id, SUCCEEDED, result=html_output)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            await asyncio.to_thread(self.store.update, job_id, FAILED, error=str(e))
+        finally:
+            self._progress.pop(job_id, None)
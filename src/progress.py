@@ -0,0 +1,10 @@
+from typing import Any, Callable, Dict, Optional
+
+# Called as progress(event, data) from the event loop thread
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+
+
+def report(progress: Optional[ProgressCallback], event: str, **data):
+    """Send a progress event if the caller asked for them."""
+    if progress is not None:
+        progress(event, data)
@@ -0,0 +1,87 @@
+from dataclasses import dataclass
+from typing import Any, Dict
+from .chunking import estimate_tokens
+
+# Everything that is the same for every section lives in the system prompt, so each
+# request starts with an identical prefix and only the section text varies
+NOTES_SYSTEM_PROMPT = """You are an expert educational content creator, skilled at breaking down complex topics into clear, organized notes for students.
+
+You will receive a lecture transcript, or one section of a longer lecture. Create detailed educational notes from it. Focus on:
+
+1. Key Concepts and Definitions
+   - Identify and explain important terms and concepts
+   - Highlight fundamental principles discussed
+
+2. Main Ideas and Supporting Details
+   - Break down complex topics into clear explanations
+   - Include relevant examples or analogies used
+
+3. Important Relationships and Connections
+   - Show how different concepts relate to each other
+   - Identify cause-and-effect relationships
+
+4. Practical Applications
+   - Note any real-world applications mentioned
+   - Include practice problems or exercises if mentioned
+
+5. Additional Resources
+   - Note any recommended readings or materials mentioned
+   - Include references to related topics for further study
+
+Format the notes in a clear, hierarchical structure using markdown formatting. Include bullet points and sub-points where appropriate. If specific formulas, equations, or technical details are mentioned, include them with proper formatting.
+
+Headings should be content-specific, not necessarily matching the lecture structure. Use clear, concise language to explain complex topics effectively.
+
+Please maintain academic language while ensuring the notes are clear and accessible to students. Include any diagrams or visual concepts described in words."""
+
+
+# Merges get their own constant system prompt, so it is cached as a prefix across merge requests
+NOTES_MERGE_SYSTEM_PROMPT = """You are an expert educational content creator. You combine partial notes taken from consecutive parts of one lecture into a single well-organized set of notes for students.
+
+When merging:
+- Combine repeated definitions, concepts and examples into a single entry
+- Keep every distinct concept, formula, example and resource; do not drop details to save space
+- Organize the result by topic with content-specific markdown headings, not by part number
+- Keep timestamps that appear in headings next to the topics they belong to
+
+Format the result in a clear, hierarchical structure using markdown formatting, with bullet points and sub-points where appropriate. Reply with the merged notes only."""
+
+
+def notes_user_message(text: str, section_number: int = None, total_sections: int = None) -> str:
+    """Short per-request message: where this text sits in the lecture, then the text itself."""
+    if section_number and total_sections:
+        return f"Lecture section {section_number} of {total_sections}:\n\n{text}"
+    return f"Lecture transcript:\n\n{text}"
+
+
+@dataclass
+class PromptUsage:
+    """Input-token accounting for the requests of one notes job."""
+    requests: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    prefix_tokens: int = 0
+
+    def record(self, response: Any, system_prompt: str):
+        """Add one completed request, using the provider's usage figures when present."""
+        self.requests += 1
+        self.prefix_tokens += estimate_tokens(system_prompt)
+        usage = getattr(response, 'usage', None)
+        if usage is None:
+            return
+        self.prompt_tokens += getattr(usage, 'prompt_tokens', 0) or 0
+        details = getattr(usage, 'prompt_tokens_details', None)
+        self.cached_tokens += getattr(details, 'cached_tokens', 0) or 0
+
+    def summary(self) -> Dict[str, int]:
+        """
+        repeated_prefix_tokens is the instruction prefix re-sent after the first request, which the
+        provider can serve from its prompt cache; cached_tokens is how much actually was, when reported.
+        """
+        return {
+            'requests': self.requests,
+            'prompt_tokens': self.prompt_tokens,
+            'prefix_tokens': self.prefix_tokens,
+            'repeated_prefix_tokens': self.prefix_tokens - self.prefix_tokens // max(1, self.requests),
+            'cached_tokens': self.cached_tokens,
+        }
@@ -0,0 +1,52 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        """Allow `rate` requests per second with bursts of up to `capacity`."""
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        """Add the tokens earned since the last refill."""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1):
+        """Wait until `tokens` are available, then consume them."""
+        # Waiters queue on the lock so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+class RateLimiterRegistry:
+    def __init__(self, rate: float, capacity: float, max_keys: int = 256):
+        """Hand out one token bucket per API key, forgetting the least recently used keys."""
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    def get(self, api_key: Optional[str]) -> TokenBucket:
+        """Get the bucket for an API key, creating it on first use."""
+        bucket = self._buckets.get(api_key)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.capacity)
+            self._buckets[api_key] = bucket
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(api_key)
+        return bucket
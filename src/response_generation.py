@@ -1,12 +1,52 @@
 from .youtube_handler import YouTubeHandler
-from .groq_client import GroqHandler
-from .html_convertor import convert_markdown_to_html
-from fastapi.responses import HTMLResponse
+from .groq_client import GroqHandler, ChatFailed
+from .html_convertor import render_markdown, wrap_html_document, fragment_link_header, IncrementalMarkdownRenderer
+from .cache import MemoryCache, SQLiteCache, TieredCache
+from .config import Config
+from .single_flight import SingleFlight
+from .sse import format_sse
+from .progress import report
+from .jobs import JobManager, JobStore
+from .compression import choose_encoding, compress
+from .chat_sessions import ChatSession, ChatSessionStore
+from .chunking import estimate_tokens, format_timestamp
+from fastapi.responses import HTMLResponse, Response
+from typing import Optional, Tuple
+import asyncio
+import hashlib
 
 # Initialize YouTube handler
 youtube_handler = YouTubeHandler()
 groq_handler = GroqHandler()
 
+# Generated notes keyed by GroqHandler.notes_cache_key
+notes_cache = TieredCache(
+    memory=MemoryCache(max_entries=Config.NOTES_MEMORY_CACHE_ENTRIES, ttl_seconds=Config.NOTES_CACHE_TTL),
+    disk=SQLiteCache(
+        Config.CACHE_DB_PATH,
+        namespace="notes",
+        ttl_seconds=Config.NOTES_CACHE_TTL,
+        max_bytes=Config.NOTES_CACHE_MAX_MB * 1024 * 1024
+    )
+)
+
+# gzip/brotli-encoded notes responses keyed by notes version (a digest of the body), format and coding
+encoded_notes_cache = SQLiteCache(
+    Config.CACHE_DB_PATH,
+    namespace="notes_encoded",
+    ttl_seconds=Config.NOTES_CACHE_TTL,
+    max_bytes=Config.NOTES_ENCODED_CACHE_MAX_MB * 1024 * 1024
+)
+
+# Server-side chat conversations keyed by session ID
+chat_sessions = ChatSessionStore(max_sessions=Config.CHAT_SESSION_MAX, ttl_seconds=Config.CHAT_SESSION_TTL)
+
+# In-flight note jobs keyed by normalized video ID
+notes_flight = SingleFlight()
+
+# Caps transcript + LLM pipelines running at once, whichever endpoint started them
+pipeline_slots = asyncio.Semaphore(Config.MAX_CONCURRENT_PIPELINES)
+
 import logging
 from .logger import setup_logger
 
@@ -17,32 +57,297 @@ logger = setup_logger(
 )
 
 
-def generate_notes(youtube_url: str, groq_api=None):
+async def generate_notes(youtube_url: str, groq_api=None, format='document', accept_encoding=None):
     
     """Generate notes for a YouTube video"""
     logger.info('Groq API: {}'.format(groq_api))
     video_id = youtube_handler.extract_video_id(youtube_url)
-    summary = ""
+
+    # Concurrent requests for the same video share one transcript/LLM job
+    body_html, version = await notes_flight.do(video_id, build_notes_body, video_id, groq_api)
+    # POST never answers 304 (only GET/HEAD may); revalidation goes through GET /api/notes/{video_id}
+    return await notes_response(body_html, version, format, accept_encoding)
+
+async def cached_notes_response(youtube_url: str, format='document', accept_encoding=None, if_none_match=None) -> Optional[Response]:
+    """Notes already in the cache as a response, or None; never fetches a transcript or calls the model."""
+    video_id = youtube_handler.extract_video_id(youtube_url)
+    body_html = await cached_notes_body(video_id) if video_id else None
+    if body_html is None:
+        return None
+    return await notes_response(body_html, notes_version(body_html), format, accept_encoding, if_none_match)
+
+async def cached_notes_body(video_id) -> Optional[str]:
+    """Rendered notes for a video if both its transcript and notes are cached, else None."""
+    transcript_text, _ = await youtube_handler.cached_transcript(video_id)
+    if not transcript_text:
+        return None
+    cached = await asyncio.to_thread(notes_cache.get, groq_handler.notes_cache_key(transcript_text))
+    if not cached or 'body' not in cached:
+        return None
+    return cached['body']
+
+async def notes_response(body_html: str, version, format='document', accept_encoding=None, if_none_match=None) -> Response:
+    """
+    Notes as an HTTP response: compressed when large, with a strong ETag per cached notes version.
+    Encoded bodies are stored next to the cached notes, so each one is compressed only once.
+    """
+    if format == 'fragment':
+        headers = {"Link": fragment_link_header('monokai')}
+    else:
+        headers = {}
+        body_html = wrap_html_document(body_html, code_style='monokai')
+    body = body_html.encode('utf-8')
+    encoding = choose_encoding(accept_encoding, len(body))
+    headers["Vary"] = "Accept-Encoding"
+
+    if version is None:
+        # Nothing cached to validate against (e.g. no transcript); send it uncached
+        if encoding:
+            body = await asyncio.to_thread(compress, body, encoding)
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="text/html", headers=headers)
+
+    # Each representation (format and coding) of a notes version gets its own strong ETag
+    etag = f'"{version}.{format}.{encoding or "identity"}"'
+    headers["ETag"] = etag
+    headers["Cache-Control"] = "no-cache"  # always revalidate; unchanged notes cost a 304
+    if if_none_match and (etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"):
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        encoded_key = f"{version}:{format}:{encoding}"
+        encoded = await asyncio.to_thread(encoded_notes_cache.get_bytes, encoded_key)
+        if encoded is None:
+            encoded = await asyncio.to_thread(compress, body, encoding)
+            await asyncio.to_thread(encoded_notes_cache.set_bytes, encoded_key, encoded)
+        body = encoded
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="text/html", headers=headers)
+
+def html_response(body_html: str, format='document') -> HTMLResponse:
+    """Full page, or just the body with a Link header to the cacheable stylesheet and script."""
+    if format == 'fragment':
+        return HTMLResponse(content=body_html, headers={"Link": fragment_link_header('monokai')})
+    # Wrap in the page shell with monokai style (dark theme for better visibility)
+    return HTMLResponse(content=wrap_html_document(body_html, code_style='monokai'))
+
+async def build_notes_body(video_id, groq_api=None, progress=None) -> Tuple[str, Optional[str]]:
+    """
+    Fetch the transcript and render the notes body for an already-extracted video ID.
+    Returns (body_html, version); version identifies the cached notes and is None if nothing was cached.
+    """
     if video_id:
+        # Cache hits are answered before taking a pipeline slot, so they never queue behind Whisper/LLM runs
+        body_html = await cached_notes_body(video_id)
+        if body_html is not None:
+            logger.info(f"Notes cache hit for videoId: {video_id}")
+            report(progress, "progress", stage="sections", status="cached")
+            return body_html, notes_version(body_html)
 
-        transcript_text, detailed_transcript = youtube_handler.get_transcript(video_id, groq_api=groq_api)
-        if transcript_text:
-            summary = groq_handler.generate_educational_notes(transcript_text, groq_api=groq_api)
+        async with pipeline_slots:
+            transcript_text, detailed_transcript = await youtube_handler.get_transcript(
+                video_id, groq_api=groq_api, progress=progress
+            )
+            if transcript_text:
+                cache_key = groq_handler.notes_cache_key(transcript_text)
+                cached = await asyncio.to_thread(notes_cache.get, cache_key)
+                if cached and 'body' in cached:
+                    logger.info(f"Notes cache hit for videoId: {video_id}")
+                    report(progress, "progress", stage="sections", status="cached")
+                    return cached['body'], notes_version(cached['body'])
 
-    # Convert to HTML with monokai style (dark theme for better visibility)
-    html_output = convert_markdown_to_html(summary, code_style='monokai')
-    response = HTMLResponse(content=html_output)
-    return response
+                summary = await groq_handler.generate_educational_notes(
+                    transcript_text, groq_api=groq_api, progress=progress,
+                    detailed_transcript=detailed_transcript
+                )
+                if summary:
+                    body_html = await asyncio.to_thread(render_markdown, summary)
+                    await asyncio.to_thread(notes_cache.set, cache_key, {'markdown': summary, 'body': body_html})
+                    return body_html, notes_version(body_html)
+
+    return "", None
+
+def notes_version(body_html: str) -> str:
+    """
+    Identifier for one rendering of the notes: a digest of the body itself, so it changes whenever
+    the content does (a regenerated section, or notes rebuilt after eviction) and never otherwise.
+    """
+    return hashlib.sha256(body_html.encode('utf-8')).hexdigest()[:32]
+
+async def regenerate_notes_section(youtube_url: str, index: int, groq_api=None) -> dict:
+    """Regenerate one section of a video's notes and refresh the cached document around it."""
+    video_id = youtube_handler.extract_video_id(youtube_url)
+    if not video_id:
+        raise ValueError("Could not find a YouTube video ID in the URL")
+
+    async with pipeline_slots:
+        transcript_text, detailed_transcript = await youtube_handler.get_transcript(video_id, groq_api=groq_api)
+        if not transcript_text:
+            raise ValueError("No transcript is available for this video")
+
+        section, markdown = await groq_handler.regenerate_section(
+            transcript_text, index, groq_api=groq_api, detailed_transcript=detailed_transcript
+        )
+        if markdown is None:
+            raise RuntimeError(f"Failed to regenerate section {index}")
 
-def chat_response_generation(message: str, encoded_image: str, groq_api=None):
+        # Every other section comes from the section cache (and, in merge mode, every merge not above
+        # this section from the merge cache), so only the section and the merges over it are re-billed
+        summary = await groq_handler.generate_educational_notes(
+            transcript_text, groq_api=groq_api, detailed_transcript=detailed_transcript
+        )
+        if summary:
+            body_html = await asyncio.to_thread(render_markdown, summary)
+            # The new body has a new digest, hence a new ETag, so clients don't keep the old notes
+            cache_key = groq_handler.notes_cache_key(transcript_text)
+            await asyncio.to_thread(notes_cache.set, cache_key, {'markdown': summary, 'body': body_html})
+
+    section_html = await asyncio.to_thread(render_markdown, markdown)
+    return {'index': section.index, 'start': section.start, 'end': section.end, 'html': section_html}
+
+def open_chat_session(session_id=None, youtube_url=None) -> ChatSession:
+    """Resume a chat session (or start one), optionally tied to a video."""
+    video_id = youtube_handler.extract_video_id(youtube_url) if youtube_url else None
+    return chat_sessions.get_or_create(session_id, video_id)
+
+async def chat_context(session: ChatSession, message: str) -> Optional[str]:
+    """Background for the assistant: what the session's video says about the question, and the conversation summary."""
+    parts = []
+    if session.video_id:
+        transcript_text, _ = await youtube_handler.cached_transcript(session.video_id)
+        if transcript_text and estimate_tokens(transcript_text) <= Config.CHAT_TRANSCRIPT_TOKENS:
+            parts.append(f"Transcript of the lecture the user is studying:\n{transcript_text}")
+        elif transcript_text:
+            # Long lectures: only the passages that best match this question (and the one before it)
+            previous = [turn['content'] for turn in session.turns if turn['role'] == 'user'][-1:]
+            index = await youtube_handler.transcript_index(session.video_id)
+            hits = index.search(' '.join(previous + [message]), Config.CHAT_RETRIEVAL_TOP_K) if index else []
+            if hits:
+                # Passages are numbered in transcript order; a passage whose start isn't known goes unstamped
+                passages = sorted((passage for passage, _ in hits), key=lambda passage: passage.index)
+                excerpts = "\n".join(
+                    f"[{format_timestamp(passage.start)}] {passage.text}" if passage.start is not None else passage.text
+                    for passage in passages
+                )
+                parts.append(
+                    "Excerpts from the lecture the user is studying, chosen for this question "
+                    f"(cite the bracketed timestamps when you use them):\n{excerpts}"
+                )
+    if session.summary:
+        parts.append(f"Summary of the earlier conversation:\n{session.summary}")
+    return "\n\n".join(parts) or None
+
+async def chat_turn(session: ChatSession, message: str, encoded_image: str, groq_api=None):
+    """Stream one answer within a session and record the exchange in its history."""
+    # Fold old turns into the summary first, so the prompt stays bounded however long the chat runs
+    await session.compact(
+        Config.CHAT_HISTORY_TOKENS,
+        lambda summary, turns: groq_handler.summarize_chat(summary, turns, groq_api=groq_api)
+    )
+    context = await chat_context(session, message)
+
+    answer = []
+    try:
+        async for response_chunk in groq_handler.process_streamed_chat(
+            message, encoded_image, groq_api=groq_api, history=session.turns, context=context
+        ):
+            answer.append(response_chunk)
+            yield response_chunk
+    except ChatFailed:
+        # The user still gets an apology, but it (and any partial answer) stays out of the history
+        yield "I apologize, but I encountered an error processing your message. Please try again."
+        return
+
+    # Images aren't kept in the history, only a note that one was sent
+    session.add_turn(f"{message}\n[image attached]" if encoded_image else message, ''.join(answer))
+
+async def chat_response_generation(message: str, encoded_image: str, groq_api=None, format='document', session_id=None, youtube_url=None):
+
+    session = open_chat_session(session_id, youtube_url)
 
-    # Stream the response
     full_response = ""
-    for response_chunk in groq_handler.process_streamed_chat(message, encoded_image, groq_api=groq_api):
+    async for response_chunk in chat_turn(session, message, encoded_image, groq_api=groq_api):
         full_response += response_chunk
 
-    # Convert to HTML with monokai style (dark theme for better visibility)
-    html_output = convert_markdown_to_html(full_response, code_style='monokai')
-    response = HTMLResponse(content=html_output)
+    # Render the whole answer in one pass so reference links, footnotes and heading ids resolve across blocks
+    body_html = await asyncio.to_thread(render_markdown, full_response)
+    response = html_response(body_html, format)
+    response.headers["X-Session-Id"] = session.id
     # print(response.body.decode())
-    return response
\ No newline at end of file
+    return response
+
+async def stream_chat_response(message: str, encoded_image: str, groq_api=None, session: Optional[ChatSession] = None):
+    """Yield the chatbot answer as Server-Sent Events while tokens arrive."""
+    session = session or open_chat_session()
+    renderer = IncrementalMarkdownRenderer()
+    async for response_chunk in chat_turn(session, message, encoded_image, groq_api=groq_api):
+        yield format_sse("token", {"text": response_chunk})
+
+        # Send HTML for each markdown block as soon as it is complete; only a newline can complete one
+        if '\n' not in response_chunk:
+            renderer.feed(response_chunk)
+            continue
+        for block_html in await asyncio.to_thread(renderer.feed, response_chunk):
+            yield format_sse("html", {"html": block_html})
+
+    tail_html = await asyncio.to_thread(renderer.flush)
+    if tail_html:
+        yield format_sse("html", {"html": tail_html})
+    yield format_sse("done", {})
+
+
+async def stream_notes(youtube_url: str, groq_api=None, format='document'):
+    """Yield progress, per-section HTML and the final document as Server-Sent Events."""
+    video_id = youtube_handler.extract_video_id(youtube_url)
+    if not video_id:
+        yield format_sse("error", {"message": "Could not find a YouTube video ID in the URL"})
+        return
+
+    # Pipeline callbacks run on the event loop, so a plain asyncio.Queue is enough
+    events = asyncio.Queue()
+
+    def progress(event, data):
+        events.put_nowait((event, data))
+
+    async def run_pipeline():
+        try:
+            body_html, _ = await build_notes_body(video_id, groq_api, progress=progress)
+            if format != 'fragment':
+                body_html = wrap_html_document(body_html, code_style='monokai')
+            events.put_nowait(("complete", {"html": body_html}))
+        except Exception as e:
+            logger.error(f"Error streaming notes for {video_id}: {str(e)}")
+            events.put_nowait(("error", {"message": str(e)}))
+        finally:
+            events.put_nowait(None)
+
+    pipeline = asyncio.create_task(run_pipeline())
+    try:
+        while (item := await events.get()) is not None:
+            event, data = item
+            if event == "section":
+                section_html = await asyncio.to_thread(render_markdown, data.pop("markdown"))
+                data = {**data, "html": section_html}
+            yield format_sse(event, data)
+        yield format_sse("done", {})
+    finally:
+        # Client went away: stop spending Whisper/LLM calls on it
+        if not pipeline.done():
+            pipeline.cancel()
+
+
+async def run_notes_job(video_id, groq_api=None, progress=None) -> str:
+    """Job runner: share work with any in-flight request for the same video."""
+    body_html, version = await notes_flight.do(video_id, build_notes_body, video_id, groq_api, progress=progress)
+    if version is None:
+        # No transcript, or the model produced nothing; fail the job rather than store an empty page
+        raise RuntimeError("Could not generate notes for this video")
+    return wrap_html_document(body_html, code_style='monokai')
+
+notes_jobs = JobManager(
+    JobStore(Config.JOBS_DB_PATH),
+    runner=run_notes_job,
+    worker_count=Config.NOTES_JOB_WORKERS,
+    max_queued=Config.NOTES_JOB_MAX_QUEUED,
+    retention_seconds=Config.NOTES_JOB_RETENTION
+)
@@ -0,0 +1,78 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Tuple
+import numpy as np
+from .chunking import Section, TokenChunker
+
+_WORD = re.compile(r"\w+")
+
+# Words too common in lectures to say anything about which passage a question is about
+_STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from had has have how i if in into is it its
+me my of on or so that the their then there these they this to was we were what when where
+which who why will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words without stopwords."""
+    return [word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, passages: List[Section], k1: float = 1.5, b: float = 0.75):
+        """
+        Okapi BM25 over transcript passages.
+        Postings are NumPy arrays, so a query costs one vectorized update per query term.
+        """
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+
+        postings = defaultdict(lambda: ([], []))
+        lengths = []
+        for doc_id, passage in enumerate(passages):
+            terms = tokenize(passage.text)
+            lengths.append(len(terms))
+            for term, count in Counter(terms).items():
+                doc_ids, counts = postings[term]
+                doc_ids.append(doc_id)
+                counts.append(count)
+
+        self._lengths = np.array(lengths, dtype=np.float32)
+        average = float(self._lengths.mean()) if passages else 0.0
+        # Per-document part of the BM25 denominator, computed once
+        self._norms = k1 * (1 - b + b * self._lengths / average) if average else self._lengths
+        total = len(passages)
+        self._postings = {
+            term: (
+                np.array(doc_ids, dtype=np.int32),
+                np.array(counts, dtype=np.float32),
+                math.log(1 + (total - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            )
+            for term, (doc_ids, counts) in postings.items()
+        }
+
+    @classmethod
+    def from_transcript(cls, detailed_transcript: List[Dict[str, Any]], passage_tokens: int) -> "BM25Index":
+        """Index caption entries grouped into timestamped passages of about passage_tokens each."""
+        return cls(TokenChunker(passage_tokens).chunk_entries(detailed_transcript))
+
+    def search(self, query: str, k: int) -> List[Tuple[Section, float]]:
+        """Top-k passages for a query, best first; passages sharing no terms with it are left out."""
+        if not self.passages:
+            return []
+        scores = np.zeros(len(self.passages), dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            doc_ids, counts, idf = posting
+            scores[doc_ids] += idf * counts * (self.k1 + 1) / (counts + self._norms[doc_ids])
+
+        matched = np.flatnonzero(scores)
+        if matched.size == 0:
+            return []
+        top = matched[np.argsort(-scores[matched], kind='stable')[:k]]
+        return [(self.passages[i], float(scores[i])) for i in top]
@@ -0,0 +1,32 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from .logger import get_logger
+
+logger = get_logger()
+
+
+class SingleFlight:
+    def __init__(self):
+        """Coalesce concurrent calls that share a key into one in-flight task."""
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Run func(*args, **kwargs) unless a call with the same key is already running,
+        in which case wait for that call and share its result (or exception).
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            logger.info(f"Joining in-flight job for {key}")
+
+        # Shield so one caller disconnecting doesn't cancel the job for everyone else
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        """Drop a finished task so the next call starts fresh."""
+        if self._calls.get(key) is task:
+            del self._calls[key]
@@ -0,0 +1,7 @@
+import json
+from typing import Any
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode one Server-Sent Events message with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
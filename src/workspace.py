@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+from .logger import get_logger
+
+logger = get_logger()
+
+
+class WorkspaceQuotaExceeded(Exception):
+    """Raised when a job writes more scratch data than its quota allows."""
+
+
+class Workspace:
+    def __init__(self, quota_bytes: int, root: Optional[str] = None, prefix: str = "job_"):
+        """Private scratch directory for one job, removed as a whole on cleanup."""
+        if root:
+            os.makedirs(root, exist_ok=True)
+        self.path = Path(tempfile.mkdtemp(prefix=prefix, dir=root))
+        self.quota_bytes = quota_bytes
+
+    def usage(self) -> int:
+        """Total bytes currently written in the workspace."""
+        return sum(f.stat().st_size for f in self.path.rglob("*") if f.is_file())
+
+    def check_quota(self):
+        """Raise WorkspaceQuotaExceeded if the workspace is over its disk quota."""
+        used = self.usage()
+        if used > self.quota_bytes:
+            raise WorkspaceQuotaExceeded(
+                f"Workspace uses {used/1024/1024:.2f} MB, quota is {self.quota_bytes/1024/1024:.2f} MB"
+            )
+
+    def clear(self):
+        """Delete everything in the workspace but keep the directory."""
+        for entry in self.path.iterdir():
+            if entry.is_dir():
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                entry.unlink(missing_ok=True)
+
+    def cleanup(self):
+        """Delete the workspace and everything in it."""
+        try:
+            shutil.rmtree(self.path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Error cleaning up workspace {self.path}: {str(e)}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
@@ -2,32 +2,73 @@ import re
 from youtube_transcript_api import YouTubeTranscriptApi
 from yt_dlp import YoutubeDL
 import os
-import tempfile
-from groq import Groq
+import asyncio
+from groq import APIStatusError
 from pathlib import Path
 from pydub import AudioSegment
 import math
-import time
+import csv
+import shutil
+import subprocess
+from .config import Config
+from .cache import MemoryCache, SQLiteCache
 from .logger import get_logger
+from .rate_limiter import RateLimiterRegistry
+from .client_pool import groq_clients
+from .progress import report
+from .workspace import Workspace
+from .cookies import cookie_jar
+from .chunk_planner import frame_energy, plan_cut_points
+from .retrieval import BM25Index
+from typing import Optional
 
 logger = get_logger()
 
 
+class SharedCookiesYoutubeDL(YoutubeDL):
+    """YoutubeDL that reads the shared cookie file but never writes it back."""
+
+    def save_cookies(self):
+        # Other jobs may be reading the same file; a non-atomic rewrite could truncate it under them
+        pass
+
 
 class YouTubeHandler:
     def __init__(self):
         """Initialize the YouTube handler with necessary configurations."""
 
-        # Create temporary directory for processing files
-        self.temp_dir = tempfile.mkdtemp()
-
         # Set chunk duration to 2 minutes to stay within token limits
         self.mins = 15
         self.MAX_CHUNK_DURATION = self.mins * 60 * 1000  
 
         # Configure rate limiting
         self.RATE_LIMIT_DELAY = 1
-        self.MAX_RETRIES = 2   
+        self.MAX_RETRIES = 3   
+        self.rate_limiters = RateLimiterRegistry(
+            rate=Config.WHISPER_REQUESTS_PER_SECOND,
+            capacity=Config.WHISPER_REQUEST_BURST
+        )
+
+        # Transcripts (captions or Whisper output) keyed by video ID and language
+        self.transcript_cache = SQLiteCache(
+            Config.CACHE_DB_PATH,
+            namespace="transcripts",
+            ttl_seconds=Config.TRANSCRIPT_CACHE_TTL,
+            max_bytes=Config.TRANSCRIPT_CACHE_MAX_MB * 1024 * 1024
+        )
+
+        # BM25 indexes over fetched transcripts, used to ground chat answers in the lecture
+        self.transcript_indexes = MemoryCache(
+            max_entries=Config.RETRIEVAL_INDEX_ENTRIES,
+            ttl_seconds=Config.TRANSCRIPT_CACHE_TTL
+        )
+
+        # Streamed chunks are cut at fixed times, so only pipeline when pause-aware cuts are off
+        self.pipeline_mode = Config.AUDIO_PIPELINE_MODE
+        if self.pipeline_mode == 'pipelined' and Config.AUDIO_SILENCE_AWARE_SPLIT:
+            self.pipeline_mode = 'staged'
+            logger.warning("AUDIO_PIPELINE_MODE=pipelined needs AUDIO_SILENCE_AWARE_SPLIT=false; using staged transcription")
+        logger.info(f"Audio transcription mode: {self.pipeline_mode}")
 
     def extract_video_id(self, url):
         """Extract YouTube video ID from various URL formats."""
@@ -47,41 +88,239 @@ class YouTubeHandler:
                 return match.group(1)
         return None
 
-    def download_audio(self, video_id):
-        """Download audio from YouTube video in mp3 format."""
+    def download_audio(self, video_id, workspace, cookies_path):
+        """Download the audio track into a job workspace, kept in its native container."""
         try:
-            output_path = Path(self.temp_dir) / f"{video_id}_audio"
+            output_path = workspace.path / f"{video_id}_audio"
             
-            # Configure download options for best audio quality
+            # Chunks are re-encoded to mono 64k anyway, so skip the high-bitrate mp3 intermediate
             ydl_opts = {
-                'format': 'bestaudio/best',
-                'outtmpl': str(output_path),
-                'cookiefile': str(Path('cookies.txt').resolve()),  # Using absolute path
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '192',
-                }],
+                'format': Config.AUDIO_SOURCE_FORMAT,
+                'outtmpl': str(output_path) + '.%(ext)s',
+                'cookiefile': cookies_path,
+                'max_filesize': workspace.quota_bytes,
                 'quiet': True,
                 'no_warnings': True,
                 'ignoreerrors': True  # Added to handle some common errors
             }
 
             # Download the audio
-            with YoutubeDL(ydl_opts) as ydl:
+            with SharedCookiesYoutubeDL(ydl_opts) as ydl:
                 url = f"https://www.youtube.com/watch?v={video_id}"
-                ydl.download([url])
+                info = ydl.extract_info(url, download=True)
+                if not info:
+                    raise Exception("yt-dlp returned no video info")
+                audio_path = ydl.prepare_filename(info)
+
+            workspace.check_quota()
+            return audio_path
+
+        except Exception as e:
+            logger.error(f"Error downloading audio: {str(e)}")
+            return None
 
-            return str(output_path) + '.mp3'
+    def split_audio(self, audio_path, workspace, start_seconds=0.0):
+        """Split audio (from start_seconds on) into Whisper-ready chunks using the configured AUDIO_SPLIT_MODE."""
+        if Config.AUDIO_SPLIT_MODE == 'pydub':
+            return self.split_audio_into_chunks(audio_path, workspace, start_seconds=start_seconds)
+        return self.split_audio_with_ffmpeg(audio_path, workspace, start_seconds=start_seconds)
 
+    def split_audio_with_ffmpeg(self, audio_path, workspace, start_seconds=0.0):
+        """Cut and re-encode audio into mono 64k chunks in a single streaming ffmpeg pass."""
+        try:
+            ffmpeg = shutil.which('ffmpeg')
+            if not ffmpeg:
+                raise FileNotFoundError("ffmpeg not found on PATH")
+
+            segment_list = workspace.path / "chunks.csv"
+            cut_args = self._plan_segment_args(audio_path, ffmpeg, start_seconds)
+            input_args = ["-ss", str(start_seconds), "-i", str(audio_path)] if start_seconds else ["-i", str(audio_path)]
+
+            # ffmpeg decodes and encodes frame by frame, so memory stays flat for any video length
+            subprocess.run(
+                self._segment_command(ffmpeg, input_args, cut_args, segment_list, workspace),
+                check=True,
+                capture_output=True,
+                text=True
+            )
+
+            chunks = self._read_segment_list(segment_list, workspace, offset=start_seconds)
+            logger.info(f"Processing in {len(chunks)} chunks (up to {self.mins} minutes each)")
+            return chunks
+
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Error splitting audio: ffmpeg exited with {e.returncode}: {e.stderr.strip()}")
+            return None
         except Exception as e:
+            logger.error(f"Error splitting audio: {str(e)}")
             return None
 
-    def split_audio_into_chunks(self, audio_path):
-        """Split audio file into manageable chunks for processing."""
+    def _segment_command(self, ffmpeg, input_args, cut_args, segment_list, workspace):
+        """ffmpeg command that encodes the input into Whisper-ready chunks plus a CSV segment list."""
+        return [
+            ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+            *input_args,
+            "-map", "0:a:0", "-vn",
+            "-ac", "1",              # Mono audio
+            "-c:a", "libmp3lame",
+            "-b:a", f"{Config.AUDIO_CHUNK_BITRATE_KBPS}k",  # Reduced bitrate
+            "-f", "segment",
+            *cut_args,
+            "-reset_timestamps", "1",
+            "-segment_list", str(segment_list),
+            "-segment_list_type", "csv",
+            str(workspace.path / "chunk_%03d.mp3")
+        ]
+
+    def _plan_segment_args(self, audio_path, ffmpeg, start_seconds=0.0):
+        """ffmpeg segment options: cuts at pauses when possible, fixed-length cuts otherwise."""
+        target_seconds = self.MAX_CHUNK_DURATION / 1000
+        fixed_cuts = ["-segment_time", str(target_seconds)]
+        if not Config.AUDIO_SILENCE_AWARE_SPLIT:
+            return fixed_cuts
+
+        try:
+            # Longest chunk that stays under the Whisper upload limit at the chunk bitrate
+            budget_seconds = Config.WHISPER_MAX_CHUNK_MB * 1024 * 1024 * 8 / (Config.AUDIO_CHUNK_BITRATE_KBPS * 1000)
+            frame_seconds = 0.1
+            energy = frame_energy(audio_path, ffmpeg, frame_seconds=frame_seconds, start_seconds=start_seconds)
+            cut_points = plan_cut_points(
+                energy,
+                frame_seconds=frame_seconds,
+                target_seconds=target_seconds,
+                max_seconds=min(target_seconds + Config.AUDIO_SPLIT_SEARCH_SECONDS, budget_seconds * 0.9),
+                search_seconds=Config.AUDIO_SPLIT_SEARCH_SECONDS
+            )
+        except Exception as e:
+            logger.warning(f"Silence analysis failed, using fixed-length chunks: {str(e)}")
+            return fixed_cuts
+
+        if not cut_points:
+            return fixed_cuts
+        logger.info(f"Cutting audio at {', '.join(f'{t:.1f}s' for t in cut_points)}")
+        return ["-segment_times", ",".join(str(t) for t in cut_points)]
+
+    def _read_segment_list(self, segment_list, workspace, skip=0, offset=0.0):
+        """
+        Read finished entries of ffmpeg's CSV segment list (filename,start,end) into chunk records.
+        offset is added to the times when ffmpeg's input started part-way into the track.
+        """
+        chunks = []
+        if not os.path.exists(segment_list):
+            return chunks
+
+        with open(segment_list, newline='') as f:
+            content = f.read()
+        # ffmpeg appends one line per closed segment; ignore a line still being written
+        complete_lines = content.splitlines()[:content.count('\n')]
+        for i, (filename, start, end) in enumerate(csv.reader(complete_lines[skip:]), skip):
+            chunk_path = workspace.path / filename
+            file_size = os.path.getsize(chunk_path)
+            logger.info(f"Chunk {i+1} size: {file_size/1024/1024:.2f} MB")
+            chunks.append({'path': str(chunk_path), 'start': offset + float(start), 'end': offset + float(end)})
+        workspace.check_quota()
+        return chunks
+
+    def resolve_audio_stream(self, video_id, cookies_path):
+        """Look up a direct URL (and request headers) for a low-bitrate audio-only format."""
+        ydl_opts = {
+            'format': Config.AUDIO_SOURCE_FORMAT,
+            'cookiefile': cookies_path,
+            'quiet': True,
+            'no_warnings': True
+        }
+        with SharedCookiesYoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(f"https://www.youtube.com/watch?v={video_id}", download=False)
+        if not info or not info.get('url'):
+            raise Exception("No direct audio stream available")
+        return info['url'], info.get('http_headers') or {}
+
+    async def transcribe_audio_pipelined(self, video_id, groq_api, cookies_path, workspace, progress=None):
+        """
+        Stream the audio into ffmpeg and transcribe each chunk as soon as ffmpeg closes it,
+        so download, encoding and Whisper uploads overlap.
+        Chunks are fixed-length here: pause detection needs the whole track up front.
+        Returns (transcriptions, resume_at): if ffmpeg fails part-way, the chunks it finished are
+        still transcribed and resume_at is where the rest of the track begins (None when complete).
+        """
+        ffmpeg = shutil.which('ffmpeg')
+        if not ffmpeg:
+            raise FileNotFoundError("ffmpeg not found on PATH")
+
+        stream_url, headers = await asyncio.to_thread(self.resolve_audio_stream, video_id, cookies_path)
+        header_lines = ''.join(f"{name}: {value}\r\n" for name, value in headers.items())
+        input_args = ["-reconnect", "1", "-reconnect_streamed", "1"]
+        if header_lines:
+            input_args += ["-headers", header_lines]
+        input_args += ["-i", stream_url]
+
+        segment_list = workspace.path / "chunks.csv"
+        cut_args = ["-segment_time", str(self.MAX_CHUNK_DURATION / 1000)]
+        process = await asyncio.create_subprocess_exec(
+            *self._segment_command(ffmpeg, input_args, cut_args, segment_list, workspace),
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        report(progress, "progress", stage="audio_download", status="streaming")
+
+        semaphore = asyncio.Semaphore(Config.WHISPER_MAX_CONCURRENT_CHUNKS)
+        tasks = []
+        chunks_end = 0.0
+        completed = 0
+
+        async def worker(i, chunk):
+            nonlocal completed
+            async with semaphore:
+                logger.info(f"Transcribing chunk {i+1} as it arrives...")
+                result = await self.transcribe_audio_chunk(
+                    chunk['path'], i, None, groq_api=groq_api, start_time=chunk['start']
+                )
+            # Uploaded chunks aren't needed again; keep the workspace small
+            Path(chunk['path']).unlink(missing_ok=True)
+            completed += 1
+            report(progress, "progress", stage="transcription", completed=completed)
+            return result
+
+        # stderr must be drained or ffmpeg blocks once the pipe buffer fills
+        stderr_reader = asyncio.create_task(process.stderr.read())
+        exited = asyncio.create_task(process.wait())
+        try:
+            while True:
+                # Poll the segment list about once a second until ffmpeg exits
+                await asyncio.wait({exited}, timeout=1)
+                finished = exited.done()
+
+                for chunk in await asyncio.to_thread(self._read_segment_list, segment_list, workspace, len(tasks)):
+                    tasks.append(asyncio.create_task(worker(len(tasks), chunk)))
+                    chunks_end = chunk['end']
+                if finished:
+                    break
+
+            stderr = (await stderr_reader).decode(errors='replace').strip()
+            resume_at = None
+            if process.returncode != 0:
+                if not tasks:
+                    raise Exception(f"ffmpeg exited with {process.returncode}: {stderr}")
+                # Keep what already streamed; only the rest of the track needs another pass
+                resume_at = chunks_end
+                logger.warning(f"ffmpeg exited with {process.returncode} after {resume_at:.1f}s of audio: {stderr}")
+            else:
+                report(progress, "progress", stage="audio_download", status="completed", chunks=len(tasks))
+            return await asyncio.gather(*tasks), resume_at
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+                await exited
+            stderr_reader.cancel()
+            for task in tasks:
+                task.cancel()
+            raise
+
+    def split_audio_into_chunks(self, audio_path, workspace, start_seconds=0.0):
+        """Split audio file into manageable chunks for processing (decodes the whole track with pydub)."""
         try:
             # Load and process the audio file
-            audio = AudioSegment.from_mp3(audio_path)
+            audio = AudioSegment.from_file(audio_path)[int(start_seconds * 1000):]
             total_duration = len(audio)
             num_chunks = math.ceil(total_duration / self.MAX_CHUNK_DURATION)
             
@@ -89,7 +328,7 @@ class YouTubeHandler:
             logger.info(f"Total audio duration: {total_duration/1000/60:.2f} minutes")
             logger.info(f"Processing in {num_chunks} chunks ({self.mins} minutes each)")
             
-            chunk_paths = []
+            chunks = []
             for i in range(num_chunks):
                 start_time = i * self.MAX_CHUNK_DURATION
                 end_time = min((i + 1) * self.MAX_CHUNK_DURATION, total_duration)
@@ -99,7 +338,7 @@ class YouTubeHandler:
                 chunk = chunk.normalize()  # Normalize audio levels
                 
                 # Save chunk with optimized settings
-                chunk_path = Path(self.temp_dir) / f"chunk_{i}.mp3"
+                chunk_path = workspace.path / f"chunk_{i}.mp3"
                 chunk.export(
                     str(chunk_path),
                     format="mp3",
@@ -109,24 +348,22 @@ class YouTubeHandler:
                         "-ac", "1"     # Mono audio
                     ]
                 )
-                chunk_paths.append(str(chunk_path))
+                chunks.append({'path': str(chunk_path), 'start': start_seconds + start_time / 1000})
                 
                 # Display chunk information
                 file_size = os.path.getsize(chunk_path)
                 logger.info(f"Chunk {i+1} size: {file_size/1024/1024:.2f} MB")
+                workspace.check_quota()
 
-            return chunk_paths
+            return chunks
 
         except Exception as e:
             logger.error(f"Error splitting audio: {str(e)}")
             return None
 
-    def transcribe_audio_chunk(self, chunk_path, chunk_index, total_chunks, groq_api):
+    async def transcribe_audio_chunk(self, chunk_path, chunk_index, total_chunks, groq_api, start_time=None):
         """Transcribe a single audio chunk with retry mechanism."""
-        if groq_api:
-            groq_client = Groq(api_key=groq_api)
-        else:
-            groq_client = Groq(api_key=os.getenv('GROQ_API_KEY'))
+        groq_client = groq_clients.get_async(groq_api)
         for retry in range(self.MAX_RETRIES):
             try:
                 # Verify file exists and check size
@@ -134,38 +371,70 @@ class YouTubeHandler:
                     raise FileNotFoundError(f"Chunk file not found: {chunk_path}")
                 
                 file_size = os.path.getsize(chunk_path)
-                if file_size > 25 * 1024 * 1024:  # 25MB limit
+                if file_size > Config.WHISPER_MAX_CHUNK_MB * 1024 * 1024:  # Whisper upload limit
                     raise ValueError(f"Chunk file too large ({file_size/1024/1024:.2f} MB)")
                 
                 # Process the chunk
-                with open(chunk_path, "rb") as file:
-                    transcription = groq_client.audio.transcriptions.create(
-                        file=file,
-                        model="whisper-large-v3",
-                        response_format="verbose_json",
-                    )
-                    
-                    chunk_text = transcription.text if hasattr(transcription, 'text') else ""
+                audio_bytes = await asyncio.to_thread(Path(chunk_path).read_bytes)
+                await self.rate_limiters.get(groq_client.api_key).acquire()
+                transcription = await groq_client.audio.transcriptions.create(
+                    file=(Path(chunk_path).name, audio_bytes),
+                    model="whisper-large-v3",
+                    response_format="verbose_json",
+                )
+                
+                chunk_text = transcription.text if hasattr(transcription, 'text') else ""
+                if start_time is None:
                     start_time = chunk_index * (self.MAX_CHUNK_DURATION / 1000)
 
-                    return {
-                        'text': chunk_text,
-                        'start': start_time,
-                        'chunk_index': chunk_index,
-                        'total_chunks': total_chunks
-                    }
+                return {
+                    'text': chunk_text,
+                    'start': start_time,
+                    'chunk_index': chunk_index,
+                    'total_chunks': total_chunks
+                }
 
             except Exception as e:
                 error_message = str(e)
                 if 'rate_limit_exceeded' in error_message:
                     if retry < self.MAX_RETRIES - 1:
-                        wait_time = self.RATE_LIMIT_DELAY * (retry + 1)
+                        wait_time = self._retry_after(e) or self.RATE_LIMIT_DELAY * (2 ** retry)
                         logger.warning(f"Rate limit reached. Waiting {wait_time} seconds...")
-                        time.sleep(wait_time)
+                        await asyncio.sleep(wait_time)
                         continue
                 logger.error(f"Error processing chunk {chunk_index + 1}: {error_message}")
                 return None
 
+    def _retry_after(self, error):
+        """Read the server's suggested wait (seconds) from a rate-limit error, if any."""
+        if isinstance(error, APIStatusError):
+            try:
+                return float(error.response.headers.get('retry-after'))
+            except (TypeError, ValueError):
+                return None
+        return None
+
+    async def transcribe_chunks(self, chunks, groq_api, progress=None):
+        """Transcribe audio chunks concurrently with a bounded worker pool."""
+        total_chunks = len(chunks)
+        semaphore = asyncio.Semaphore(Config.WHISPER_MAX_CONCURRENT_CHUNKS)
+        completed = 0
+
+        async def worker(i, chunk):
+            nonlocal completed
+            async with semaphore:
+                logger.info(f"Transcribing chunk {i+1} of {total_chunks}...")
+                result = await self.transcribe_audio_chunk(
+                    chunk['path'], i, total_chunks, groq_api=groq_api, start_time=chunk['start']
+                )
+            completed += 1
+            report(progress, "progress", stage="transcription", completed=completed, total=total_chunks)
+            return result
+
+        return await asyncio.gather(*(
+            worker(i, chunk) for i, chunk in enumerate(chunks)
+        ))
+
     def merge_transcriptions(self, chunk_transcriptions):
         """Merge processed chunks into a complete transcript."""
         if not chunk_transcriptions:
@@ -173,7 +442,8 @@ class YouTubeHandler:
 
         # Filter and sort valid chunks
         valid_chunks = [chunk for chunk in chunk_transcriptions if chunk is not None]
-        sorted_chunks = sorted(valid_chunks, key=lambda x: x['chunk_index'])
+        # Sort by position in the track; chunks from a resumed pass restart their indices
+        sorted_chunks = sorted(valid_chunks, key=lambda x: x['start'])
         
         if not sorted_chunks:
             return None, None
@@ -198,64 +468,119 @@ class YouTubeHandler:
 
         return full_text, detailed_transcript
 
-    def get_transcript(self, video_id, groq_api=None):
-        """Get transcript from YouTube API or generate it using Whisper."""
-        cookies_path = "cookies.txt" 
+    async def cached_transcript(self, video_id, languages=('en',)):
+        """Return a previously fetched transcript without fetching it, or (None, None)."""
+        cached = await asyncio.to_thread(self.transcript_cache.get, f"{video_id}:{','.join(languages)}")
+        if cached:
+            return cached['full_text'], cached['transcript']
+        return None, None
+
+    async def transcript_index(self, video_id, languages=('en',)) -> Optional[BM25Index]:
+        """Retrieval index over a video's cached transcript, rebuilt from the cache if needed; None if never fetched."""
+        cache_key = f"{video_id}:{','.join(languages)}"
+        index = self.transcript_indexes.get(cache_key)
+        if index is None:
+            _, transcript = await self.cached_transcript(video_id, languages)
+            if transcript:
+                index = await self._index_transcript(cache_key, transcript)
+        return index
+
+    async def _index_transcript(self, cache_key, transcript) -> BM25Index:
+        """Build and keep the retrieval index for a transcript's timestamped entries."""
+        index = await asyncio.to_thread(BM25Index.from_transcript, transcript, Config.CHAT_PASSAGE_TOKENS)
+        self.transcript_indexes.set(cache_key, index)
+        return index
+
+    async def get_transcript(self, video_id, groq_api=None, languages=('en',), progress=None):
+        """Get transcript from the cache, falling back to YouTube API or Whisper."""
+        report(progress, "progress", stage="transcript", status="started")
+        cache_key = f"{video_id}:{','.join(languages)}"
+        cached = await asyncio.to_thread(self.transcript_cache.get, cache_key)
+        if cached:
+            logger.info(f"Transcript cache hit for {video_id}")
+            report(progress, "progress", stage="transcript", status="cached")
+            return cached['full_text'], cached['transcript']
+
+        full_text, transcript = await self.fetch_transcript(
+            video_id, groq_api=groq_api, languages=languages, progress=progress
+        )
+        if full_text:
+            await asyncio.to_thread(
+                self.transcript_cache.set, cache_key, {'full_text': full_text, 'transcript': transcript}
+            )
+            await self._index_transcript(cache_key, transcript)
+        report(progress, "progress", stage="transcript", status="completed" if full_text else "failed")
+        return full_text, transcript
+
+    async def fetch_transcript(self, video_id, groq_api=None, languages=('en',), progress=None):
+        """Fetch transcript from YouTube API or generate it using Whisper."""
+        # The cookie file is shared across jobs and stays in place while this one uses it
+        with cookie_jar.acquire() as cookies_path:
+            try:
+                # Try getting official transcript first
+                logger.info("Attempting to fetch official transcript...")
 
-        # Read content from environment variable
-        env_content = os.getenv('COOKIES')
-        if not env_content:
-            raise ValueError("Cookies not found")
-        
-        # Write content to file
-        with open(cookies_path, 'w') as f:
-            f.write(env_content)
+                transcript = await asyncio.to_thread(
+                    YouTubeTranscriptApi.get_transcript, video_id,
+                    languages=list(languages), cookies=cookies_path
+                )
+                # logger.info(transcript)
+                full_text = ' '.join([entry['text'] for entry in transcript])
+
+                return full_text, transcript
+            except Exception:
+                logger.info("Generating transcript from audio...")
+                return await self.generate_transcript_from_audio(
+                    video_id, groq_api, cookies_path, progress=progress
+                )
 
-        try:
-            # Try getting official transcript first
-            logger.info("Attempting to fetch official transcript...")
-            logger.info(f"Cookies path --{cookies_path}")
-
-            transcript = YouTubeTranscriptApi.get_transcript(video_id, cookies=str(Path('cookies.txt').resolve()))
-            # logger.info(transcript)
-            full_text = ' '.join([entry['text'] for entry in transcript])
-            os.remove(cookies_path)
-            logger.info("Cookies removed ...")
-
-            return full_text, transcript
-        except Exception:
-            logger.info("Generating transcript from audio...")
-            return self.generate_transcript_from_audio(video_id, groq_api)
-
-    def generate_transcript_from_audio(self, video_id, groq_api):
+    async def generate_transcript_from_audio(self, video_id, groq_api, cookies_path, progress=None):
         """Generate transcript for videos without official transcripts."""
+        # Each job gets its own scratch directory so concurrent jobs never share chunk files
+        workspace = Workspace(
+            quota_bytes=Config.WORKSPACE_QUOTA_MB * 1024 * 1024,
+            root=Config.WORKSPACE_ROOT,
+            prefix=f"{video_id}_"
+        )
+        # Transcriptions from a pipelined pass that stopped part-way; the staged pass only covers the rest
+        streamed_transcriptions = []
+        resume_at = 0.0
         try:
-            audio_path = self.download_audio(video_id)
+            if self.pipeline_mode == 'pipelined':
+                try:
+                    transcriptions, stopped_at = await self.transcribe_audio_pipelined(
+                        video_id, groq_api, cookies_path, workspace, progress=progress
+                    )
+                    chunk_transcriptions = [t for t in transcriptions if t]
+                    logger.info(f"Transcribed {len(chunk_transcriptions)} of {len(transcriptions)} streamed chunks")
+                    if stopped_at is None:
+                        if chunk_transcriptions:
+                            return self.merge_transcriptions(chunk_transcriptions)
+                        raise Exception("Failed to transcribe streamed audio chunks")
+                    streamed_transcriptions, resume_at = chunk_transcriptions, stopped_at
+                    logger.warning(f"Audio stream broke off; transcribing the rest from {resume_at:.1f}s")
+                except Exception as e:
+                    logger.warning(f"Pipelined transcription failed, falling back to download-then-split: {str(e)}")
+                await asyncio.to_thread(workspace.clear)
+
+            # yt-dlp and pydub block on network/ffmpeg, so keep them off the event loop
+            report(progress, "progress", stage="audio_download", status="started")
+            audio_path = await asyncio.to_thread(self.download_audio, video_id, workspace, cookies_path)
             if not audio_path:
                 raise Exception("Failed to download audio")
+            report(progress, "progress", stage="audio_download", status="completed")
 
-            chunk_paths = self.split_audio_into_chunks(audio_path)
-            if not chunk_paths:
+            report(progress, "progress", stage="audio_split", status="started")
+            chunks = await asyncio.to_thread(self.split_audio, audio_path, workspace, resume_at)
+            if not chunks:
                 raise Exception("Failed to split audio into chunks")
+            report(progress, "progress", stage="audio_split", status="completed", chunks=len(chunks))
 
-            # Process chunks with progress tracking
-            chunk_transcriptions = []
-            total_chunks = len(chunk_paths)
-
-            for i, chunk_path in enumerate(chunk_paths):
-                if i > 0:
-                    logger.info(f"Waiting {self.RATE_LIMIT_DELAY} seconds...")
-                    time.sleep(self.RATE_LIMIT_DELAY)
-                    
-                transcription = self.transcribe_audio_chunk(chunk_path, i, total_chunks, groq_api=groq_api)
-                logger.info("-----------",transcription)
-                if transcription:
-                    chunk_transcriptions.append(transcription)
-
-            # Remove cookies
-            cookies_path = "cookies.txt" 
-            os.remove(cookies_path)
-            logger.info("Cookies removed ...")
+            # Chunks are independent uploads, so transcribe them in parallel
+            report(progress, "progress", stage="transcription", completed=0, total=len(chunks))
+            transcriptions = await self.transcribe_chunks(chunks, groq_api, progress=progress)
+            chunk_transcriptions = streamed_transcriptions + [t for t in transcriptions if t]
+            logger.info(f"Transcribed {len(chunk_transcriptions) - len(streamed_transcriptions)} of {len(chunks)} chunks")
 
             if chunk_transcriptions:
                 return self.merge_transcriptions(chunk_transcriptions)
@@ -266,15 +591,7 @@ class YouTubeHandler:
             logger.error(f"Error generating transcript: {str(e)}")
             return None, None
         finally:
-            self.cleanup_temp_files()
-
-    def cleanup_temp_files(self):
-        """Clean up temporary files after processing."""
-        try:
-            for file in Path(self.temp_dir).glob("*"):
-                file.unlink()
-        except Exception as e:
-            logger.warning(f"Error cleaning up temporary files: {str(e)}")
+            await asyncio.to_thread(workspace.cleanup)
 
     # def create_embed_html(self, video_id):
     #     """Create HTML for embedding YouTube video."""
@@ -287,12 +604,3 @@ class YouTubeHandler:
     #             allowfullscreen>
     #         </iframe>
     #     '''
-
-    def __del__(self):
-        """Cleanup resources when the object is destroyed."""
-        try:
-            for file in Path(self.temp_dir).glob("*"):
-                file.unlink()
-            Path(self.temp_dir).rmdir()
-        except Exception:
-            pass
\ No newline at end of file